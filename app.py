@@ -1,26 +1,37 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import tempfile
 import os
-import zipfile
-import shutil
 import random
 import time
-import subprocess
 import re
 import io
-from moviepy.editor import VideoFileClip, ImageClip, CompositeVideoClip
-from PIL import Image, ImageFont, ImageDraw
+import hashlib
+import functools
+import pathlib
+from PIL import Image
+
+from atomic_file import atomic_write
+import render_queue
+from batch_render import output_name, render_text_sprite, scaled_size
+from layer_template import compile_template, parse_template
+import media_info
+from media_index import find_video_path
+from overlay_cache import CACHE_DIRNAME, configure as configure_overlay_cache
+from preview_frames import PreviewFrames
+from render_stats import summarize
+from zip_source import ZipSource, zip_digest
 
 # --- COMPATIBILITY PATCH ---
 if not hasattr(Image, 'ANTIALIAS'):
     Image.ANTIALIAS = Image.LANCZOS
+media_info.install() # previews and renders parse each source once, not on every reader open
 
 # --- 1. CONFIG & UTILS ---
 APP_NAME = "L&K Localizer - Live Editor"
 COMPANY_NAME = "LOCH & KEY PRODUCTIONS"
 PRIMARY_COLOR = "#4FBDDB"
+PREVIEW_WIDTH = 600 # live editor composite width in fast preview (2x the displayed 300px)
 
 def hex_to_rgb(h):
     h = h.lstrip('#')
@@ -31,22 +42,42 @@ def get_col(df, options):
         if opt in df.columns: return opt
     return None
 
-def get_duration_ffprobe(filepath):
-    try:
-        cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", filepath]
-        return float(subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode().strip())
-    except: return None
+# Upload-derived state, cached by content so a rerun only redoes work whose inputs changed.
+@st.cache_resource(show_spinner=False)
+def open_zip_source(digest, _upload, dest_root):
+    # digest is zip_digest(_upload): a hash of the central directory, not of the (possibly huge) member data.
+    # Saved to disk once, so the render worker can open it too and stored members are read in place, never extracted.
+    zip_path = os.path.join(dest_root, f"upload_{digest[:16]}.zip")
+    if not os.path.exists(zip_path):
+        with atomic_write(zip_path, "wb", suffix=".zip") as f:
+            f.write(_upload.getbuffer())
+    return ZipSource(zip_path, tempfile.mkdtemp(prefix="videos_", dir=dest_root))
+
+@st.cache_data(show_spinner=False)
+def zip_video_options(digest, _source):
+    names = [os.path.basename(n) for n in _source.names()]
+    return sorted(dict.fromkeys(n for n in names if n.lower().endswith(('.mp4', '.mov', '.m4v'))))
+
+@st.cache_data(show_spinner=False)
+def load_csv(data):
+    df = pd.read_csv(io.BytesIO(data))
+    col_map = {
+        'filename': get_col(df, ['Filename', 'File Name', 'Video', 'filename']),
+        'city': get_col(df, ['City', 'Location', 'city']),
+        'date': get_col(df, ['Date', 'Show Date', 'date']),
+        'venue': get_col(df, ['Venue', 'Location Name', 'venue']),
+        'ticket': get_col(df, ['Ticket_Link', 'Ticket Link', 'ticket'])
+    }
+    return df, col_map
+
+@st.cache_data(show_spinner=False)
+def save_font(data, temp_dir):
+    # One file per font content, so font_fit's caches (keyed by path and mtime) stay warm across reruns.
+    path = os.path.join(temp_dir, f"custom_font_{hashlib.sha256(data).hexdigest()[:16]}.ttf")
+    if not os.path.exists(path):
+        with open(path, "wb") as f: f.write(data)
+    return path
 
-def find_video_path(root_dir, filename):
-    direct = os.path.join(root_dir, filename)
-    if os.path.exists(direct):
-        return direct
-    for root, _dirs, files in os.walk(root_dir):
-        for f in files:
-            if f == filename:
-                return os.path.join(root, f)
-    return direct
-
 # --- 2. SESSION STATE MANAGEMENT ---
 if 'preview_img_cache' not in st.session_state:
     st.session_state.preview_img_cache = None
@@ -54,6 +85,8 @@ if 'current_preview_file' not in st.session_state:
     st.session_state.current_preview_file = None
 if 'current_frame_time' not in st.session_state:
     st.session_state.current_frame_time = 0.0
+if 'preview_readers' not in st.session_state:
+    st.session_state.preview_readers = {}
 
 st.set_page_config(page_title=APP_NAME, page_icon="🎬", layout="wide")
 
@@ -122,6 +155,11 @@ with st.sidebar:
     st.subheader("1. Layout & Motion")
     motion_profile = st.selectbox("Animation Style:", 
                                   ["Static", "Cinematic Lift", "Zoom Pop", "Ghost Drift", "Shake", "Split Convergence"])
+    render_backend = st.selectbox("Render Engine:", ["moviepy", "ffmpeg"],
+                                  format_func=lambda b: "MoviePy (compositor)" if b == "moviepy" else "FFmpeg filter graph (fast)",
+                                  help="FFmpeg renders static layers in a single native pass; animated styles always use MoviePy.")
+    draft_render = st.checkbox("Draft render (proofing)", help="Render at reduced resolution and frame rate to check text fit and timing quickly; "
+                               "the text layout matches the final render. Drafts are saved as *_draft.mp4 and never replace final renders.")
     
     st.markdown("---")
     st.subheader("2. Typography")
@@ -149,23 +187,6 @@ def update_color_globals():
 update_color_globals()
 
 # --- 5. CORE LOGIC ---
-def get_scaled_font(text, font_path, max_size, target_width, target_height, stroke_w=0, spacing=-12):
-    size = max_size
-    try:
-        font = ImageFont.truetype(font_path, int(size)) if font_path else ImageFont.load_default()
-    except:
-        return ImageFont.load_default(), size
-
-    dummy = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
-    for s in range(int(max_size), 20, -2):
-        test_font = ImageFont.truetype(font_path, s) if font_path else font
-        bbox = dummy.textbbox((0, 0), text, font=test_font, spacing=spacing, stroke_width=stroke_w, align='center')
-        text_w = bbox[2] - bbox[0]
-        text_h = bbox[3] - bbox[1]
-        if text_w <= target_width and text_h <= target_height:
-            return test_font, s
-    return font, size
-
 def slugify(text):
     if text is None:
         return ""
@@ -208,144 +229,30 @@ def validate_rows(df, col_map):
             errors.append(f"Row {i}: missing city")
     return errors
 
-def draw_text_on_image(base_img, text, font_path, font_size, color, stroke, stroke_w, shadow_off, offset_x=0, offset_y=0):
-    img = base_img.copy().convert("RGBA")
-    draw = ImageDraw.Draw(img)
-    W, H = img.size
-    
-    target_w = W * 0.85
-    target_h = H * 0.85
-    font, final_size = get_scaled_font(
-        text,
-        font_path,
-        font_size,
-        target_w,
-        target_h,
-        stroke_w=stroke_w,
-        spacing=-12,
-    )
-    
-    bbox = draw.textbbox((0, 0), text, font=font, align='center', stroke_width=stroke_w, spacing=-12)
-    text_w = bbox[2] - bbox[0]
-    text_h = bbox[3] - bbox[1]
-    
-    x = ((W - text_w) / 2 - bbox[0]) + offset_x
-    y = ((H - text_h) / 2 - bbox[1]) + offset_y
-    
-    if shadow_off > 0:
-        draw.text((x + shadow_off, y + shadow_off), text, font=font, fill=stroke, align='center', spacing=-12)
-    
-    draw.text((x, y), text, font=font, fill=color, align='center', stroke_width=stroke_w, stroke_fill=stroke, spacing=-12)
-    return img
-
-def create_split_convergence(text, font_path, font_size, video_w, video_h, duration, start_time, offset_x=0, offset_y=0):
-    lines = text.split('\n')
-    clips = []
-    target_w = video_w * 0.85
-    target_h = video_h * 0.85
-    font, final_size = get_scaled_font(
-        text,
-        font_path,
-        font_size,
-        target_w,
-        target_h,
-        stroke_w=v_stroke_width,
-        spacing=-12,
-    )
-    
-    dummy_draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
-    line_heights = []
-    for line in lines:
-        bbox = dummy_draw.textbbox((0, 0), line, font=font, stroke_width=v_stroke_width)
-        line_heights.append((bbox[3] - bbox[1]) + 20)
-    
-    total_h = sum(line_heights)
-    
-    start_y_cursor = ((video_h / 2) - (total_h / 2)) + offset_y
-    
-    for i, line in enumerate(lines):
-        dummy_img = Image.new('RGBA', (1, 1))
-        draw = ImageDraw.Draw(dummy_img)
-        bbox = draw.textbbox((0, 0), line, font=font, align='center', stroke_width=v_stroke_width)
-        w, h = int((bbox[2]-bbox[0])+80), int((bbox[3]-bbox[1])+80)
-        img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        pos = (int(40-bbox[0]), int(40-bbox[1]))
-        if v_shadow_offset > 0:
-            draw.text((pos[0]+v_shadow_offset, pos[1]+v_shadow_offset), line, font=font, fill=STROKE_RGB, align='center')
-        draw.text(pos, line, font=font, fill=TEXT_RGB, align='center', stroke_width=v_stroke_width, stroke_fill=STROKE_RGB)
-        
-        line_clip = ImageClip(np.array(img)).set_duration(duration).set_start(start_time)
-        
-        final_y = start_y_cursor
-        start_y_cursor += line_heights[i]
-        
-        final_x = ((video_w / 2) - (w / 2)) + offset_x
-        start_x = -w if i % 2 == 0 else video_w
-        
-        def pos_func(t, sx=start_x, fx=final_x, fy=final_y, st=start_time):
-            rel_t = t - st
-            if rel_t < 0: return (sx, fy)
-            progress = min(1, rel_t / 0.5)
-            ease = 1 - (1 - progress) ** 4
-            curr_x = sx + (fx - sx) * ease
-            return (curr_x, fy)
-            
-        clips.append(line_clip.set_position(pos_func))
-    return CompositeVideoClip(clips, size=(video_w, video_h)).set_duration(duration).set_start(start_time)
-
-# --- 6. RENDER FUNCTION (FIXED) ---
-def render_video(row, videos_dir, font_path, output_path, col_map, filename_override=None, venue_override=None):
-    filename_source = filename_override or (row.get(col_map.get('filename')) if col_map.get('filename') else None)
-    if not filename_source:
-        return False, "Missing filename"
-    filename = str(filename_source).strip()
-    video_full_path = find_video_path(videos_dir, filename)
-    
-    clip = None # <--- FIX: Initialize clip before try block
-    
-    try:
-        clip = VideoFileClip(video_full_path)
-        if not clip.duration: clip.duration = get_duration_ffprobe(video_full_path) or 10.0
-        
-        w, h = clip.size
-        dur = clip.duration
-        t1_dur, t2_start = dur * 0.25, dur * 0.25
-        t2_dur, t3_start = dur * 0.55, dur * 0.80
-        t3_dur = dur * 0.20
-
-        # Intro
-        txt1_img = draw_text_on_image(Image.new("RGBA", (w,h)), "LAWRENCE\nWITH JACOB JEFFRIES", font_path, v_size_main, TEXT_RGB, STROKE_RGB, v_stroke_width, v_shadow_offset, pos_x, pos_y)
-        txt1 = ImageClip(np.array(txt1_img)).set_duration(t1_dur).set_position('center').crossfadeout(0.2)
-        
-        # Middle
-        city = str(row.get(col_map['city'], 'Unknown')).upper()
-        date_val = row.get(col_map.get('date', 'Date'), '')
-        venue_val = venue_override if venue_override is not None else row.get(col_map.get('venue', 'Venue'), '')
-        ticket_val = row.get(col_map.get('ticket', 'Ticket_Link'), '')
-        content2 = f"{date_val}\n{city}\n{venue_val}".upper()
-        if motion_profile == "Split Convergence":
-            txt2 = create_split_convergence(content2, font_path, v_size_small, w, h, t2_dur, t2_start, pos_x, pos_y)
-        else:
-            base_img = Image.new("RGBA", (w,h))
-            overlay = draw_text_on_image(base_img, content2, font_path, v_size_small, TEXT_RGB, STROKE_RGB, v_stroke_width, v_shadow_offset, pos_x, pos_y)
-            txt2 = ImageClip(np.array(overlay)).set_duration(t2_dur).set_position('center').set_start(t2_start).crossfadein(0.2)
-
-        # Outro
-        content3 = f"TICKETS ON SALE NOW\n{ticket_val}".upper()
-        if motion_profile == "Split Convergence":
-            txt3 = create_split_convergence(content3, font_path, v_size_small, w, h, t3_dur, t3_start, pos_x, pos_y)
-        else:
-            overlay3 = draw_text_on_image(Image.new("RGBA", (w,h)), content3, font_path, v_size_small, TEXT_RGB, STROKE_RGB, v_stroke_width, v_shadow_offset, pos_x, pos_y)
-            txt3 = ImageClip(np.array(overlay3)).set_duration(t3_dur).set_position('center').set_start(t3_start)
-
-        final = CompositeVideoClip([clip, txt1, txt2, txt3])
-        final.write_videofile(output_path, codec='libx264', audio_codec='aac', fps=24, preset='ultrafast', verbose=False, logger=None)
-        clip.close()
-        return True, "Success"
-    except Exception as e:
-        if clip: clip.close()
-        return False, str(e)
+# --- 6. BACKGROUND RENDERS ---
+def render_job_panel():
+    # Progress of the background batch (see render_queue); reruns on its own while the job is running.
+    job_dir = st.session_state.get("render_job")
+    progress = render_queue.status(job_dir) if job_dir else None
+    if not progress:
+        return
+    total = max(progress["total"], 1)
+    if progress["state"] not in render_queue.FINISHED_STATES:
+        st.progress(progress["done"] / total)
+        st.text(f"Rendering {progress['done'] + 1}/{progress['total']}: {progress.get('current', '')}..." if progress["state"] == "running" else "Queued...")
+        if st.button("CANCEL RENDER"):
+            render_queue.cancel(job_dir)
+        return
+    if progress["state"] == "done": st.success("Batch Complete!")
+    elif progress["state"] == "cancelled": st.warning(f"Batch cancelled after {progress['done']}/{progress['total']} videos.")
+    else: st.error("Batch failed.")
+    st.expander("View Logs").write(progress["log"])
+    if progress.get("stats"):
+        rows = [(stage, seconds, f"{share:.1%}") for stage, seconds, share in summarize(progress["stats"])]
+        st.expander("Where the time went").table(pd.DataFrame(rows, columns=["Stage", "Seconds", "Share"]).set_index("Stage"))
+    if progress.get("zip_path") and os.path.exists(progress["zip_path"]):
+        # Deferred: the archive is read from disk only when the button is clicked, not on every rerun.
+        st.download_button("DOWNLOAD ZIP", functools.partial(pathlib.Path(progress["zip_path"]).read_bytes), "Tour_Assets.zip", mime="application/zip")
 
 # --- 7. MAIN APP LAYOUT ---
 st.title(APP_NAME)
@@ -357,13 +264,28 @@ with col_files:
     uploaded_zip = st.file_uploader("1. Video Zip", type=["zip"])
     uploaded_csv = st.file_uploader("2. Tour CSV", type=["csv"])
     uploaded_font = st.file_uploader("3. Font (.ttf)", type=["ttf"])
+    uploaded_template = st.file_uploader("4. Layer Template (optional)", type=["json", "yaml", "yml"], help="Layers, text and timing; run `python layer_template.py` for the default to edit.")
+    template_spec = None
+    if uploaded_template:
+        try:
+            template_spec = parse_template(uploaded_template.getvalue().decode("utf-8"), uploaded_template.name)
+        except ValueError as e:
+            st.error(f"Layer template: {e}. Using the default layout.")
+    # Compiled once per template; rows only fill in their fields.
+    template = compile_template(template_spec)
+
+# Temporary Dir Management
+if 'temp_dir' not in st.session_state:
+    st.session_state.temp_dir = tempfile.mkdtemp()
+configure_overlay_cache(os.path.join(st.session_state.temp_dir, "output", CACHE_DIRNAME))
+media_info.configure(os.path.join(st.session_state.temp_dir, "output", media_info.CACHE_DIRNAME))
 
 video_options = []
 if uploaded_zip:
-    with zipfile.ZipFile(uploaded_zip, 'r') as z:
-        zip_names = [os.path.basename(n) for n in z.namelist()]
-    video_options = [n for n in zip_names if n.lower().endswith(('.mp4', '.mov', '.m4v'))]
-    video_options = sorted(list(dict.fromkeys(video_options)))
+    # One lazy source per upload; the preview and the batch share its extracted members
+    zip_key = zip_digest(uploaded_zip)
+    st.session_state.zip_source = open_zip_source(zip_key, uploaded_zip, st.session_state.temp_dir)
+    video_options = zip_video_options(zip_key, st.session_state.zip_source)
 
     if 'default_map' not in st.session_state:
         st.session_state.default_map = {"1x1": "", "9x16": ""}
@@ -393,14 +315,8 @@ if uploaded_zip:
         )
 
 if uploaded_zip and uploaded_csv:
-    df = pd.read_csv(uploaded_csv)
-    col_map = {
-        'filename': get_col(df, ['Filename', 'File Name', 'Video', 'filename']),
-        'city': get_col(df, ['City', 'Location', 'city']),
-        'date': get_col(df, ['Date', 'Show Date', 'date']),
-        'venue': get_col(df, ['Venue', 'Location Name', 'venue']),
-        'ticket': get_col(df, ['Ticket_Link', 'Ticket Link', 'ticket'])
-    }
+    df, col_map = load_csv(uploaded_csv.getvalue())
+    col_map = {**col_map, **template.columns(df.columns, col_map)}
     
     if not col_map['city']:
         st.error("🚨 CSV Error: Missing 'City' column.")
@@ -421,7 +337,6 @@ if uploaded_zip and uploaded_csv:
             preview_idx = st.selectbox("Choose row:", df.index, format_func=lambda x: f"{df.iloc[x].get(col_map['city'], 'Unknown')}")
             
             row = df.iloc[preview_idx]
-            city_name = str(row.get(col_map['city'], 'Unknown')).upper()
             # File mapping UI
             st.markdown("**🎞️ Map Video Files (per row)**")
             if not video_options:
@@ -443,79 +358,82 @@ if uploaded_zip and uploaded_csv:
             if not video_file:
                 video_file = str(row.get(col_map['filename'])).strip()
             
-            # Temporary Dir Management
-            if 'temp_dir' not in st.session_state:
-                st.session_state.temp_dir = tempfile.mkdtemp()
-            
-            # Extract video if needed
-            video_path = os.path.join(st.session_state.temp_dir, video_file)
-            if not os.path.exists(video_path):
-                with zipfile.ZipFile(uploaded_zip, 'r') as z:
-                    try:
-                        for name in z.namelist():
-                            if os.path.basename(name) == video_file:
-                                source = z.open(name)
-                                target = open(video_path, "wb")
-                                with source, target:
-                                    shutil.copyfileobj(source, target)
-                                break
-                    except:
-                        st.error(f"Could not find {video_file} in zip.")
+            if st.session_state.zip_source.find(video_file) is None:
+                st.error(f"Could not find {video_file} in zip.")
+            dupes = st.session_state.zip_source.index.duplicates().get(os.path.basename(video_file).casefold())
+            if dupes:
+                st.warning(f"{video_file} matches {len(dupes)} files in the zip; using {st.session_state.zip_source.find(video_file)}")
+            video_path = find_video_path(st.session_state.zip_source, video_file)
             
             # Update Font
-            font_path = os.path.join(st.session_state.temp_dir, "custom_font.ttf")
-            if uploaded_font:
-                with open(font_path, "wb") as f: f.write(uploaded_font.getvalue())
-            else: font_path = None
+            font_path = save_font(uploaded_font.getvalue(), st.session_state.temp_dir) if uploaded_font else None
 
         with col_preview:
             st.subheader("👁️ LIVE EDITOR")
             
-            preview_layer = st.radio("Layer:", ["Intro (Lawrence)", "Middle (City/Venue)", "Outro (Tickets)"], horizontal=True, index=1)
-            scrub_time = st.slider("Scrub Video Frame (Sec)", 0.0, 5.0, 0.5, step=0.1)
+            layer_names = [layer.name for layer in template.layers]
+            preview_layer = st.radio("Layer:", layer_names, horizontal=True, index=min(1, len(layer_names) - 1))
+            fast_preview = st.checkbox("Fast preview (display resolution)", value=True)
 
-            # 1. Cache/Refresh the background frame
-            frame_cache_key = f"{video_file}_{scrub_time}"
-            if st.session_state.get('last_frame_key') != frame_cache_key and os.path.exists(video_path):
-                with st.spinner(f"Loading frame..."):
+            # 1. One long-lived reader per source, decoding at display size; all slider positions are decoded in a single pass on first use
+            readers = st.session_state.preview_readers
+            frames = readers.get(video_path)
+            if frames is None and (video_path.startswith("subfile,") or os.path.exists(video_path)):
+                with st.spinner(f"Loading frames..."):
                     try:
-                        clip = VideoFileClip(video_path)
-                        actual_t = min(scrub_time, clip.duration - 0.1) if clip.duration else scrub_time
-                        st.session_state.preview_img_cache = Image.fromarray(clip.get_frame(actual_t))
-                        st.session_state.last_frame_key = frame_cache_key
-                        clip.close()
+                        info = media_info.probe(video_path)
+                        frames = PreviewFrames(video_path, scaled_size(info['width'], info['height'], min(1.0, PREVIEW_WIDTH / info['width']))).warm()
+                        while len(readers) >= 4:
+                            readers.pop(next(iter(readers))).close()
+                        readers[video_path] = frames
                     except:
                         st.error("Failed to load video frame.")
+            if frames is not None and frames.strip is not None:
+                st.image(frames.strip, caption="0s - 5s", width=300)
+            if frames is not None:
+                info = media_info.probe(video_path)
+                fps_text = f"{info['fps']:.3g}" if info['fps'] is not None else "?"
+                duration_text = f"{info['duration']:.1f}" if info['duration'] is not None else "?"
+                st.caption(f"{info['width']}x{info['height']} · {fps_text} fps · {duration_text}s · {'audio' if info['has_audio'] else 'no audio'}")
+            scrub_time = st.slider("Scrub Video Frame (Sec)", 0.0, 5.0, 0.5, step=0.1)
+            if frames is not None:
+                st.session_state.preview_img_cache = (frames.size, frames.frame(scrub_time, full=not fast_preview))
 
             # 2. Real-time composite
             if st.session_state.preview_img_cache:
-                if "Intro" in preview_layer:
-                    p_text = "LAWRENCE\nWITH JACOB JEFFRIES"
-                    p_size = v_size_main
-                elif "Middle" in preview_layer:
-                    date_text = row.get(col_map.get('date', 'Date'), '')
-                    venue_text = row.get(col_map.get('venue', 'Venue'), '')
-                    if venue_choice != "Use CSV":
-                        venue_text = venue_choice
-                    p_text = f"{date_text}\n{city_name}\n{venue_text}".upper()
-                    p_size = v_size_small
-                else: # Outro
-                    ticket_text = row.get(col_map.get('ticket', 'Ticket_Link'), '')
-                    p_text = f"TICKETS ON SALE NOW\n{ticket_text}".upper()
-                    p_size = v_size_small
+                # Same row values and column mapping as the batch, venue override included.
+                p_col_map = {**col_map, 'venue': col_map['venue'] or 'Venue'}
+                p_row = row.to_dict()
+                if venue_choice != "Use CSV": p_row[p_col_map['venue']] = venue_choice
+                p_index = layer_names.index(preview_layer)
+                p_layer = template.layers[p_index]
+                p_text = template.texts(p_row, p_col_map)[p_index]
+                p_size = {"title": v_size_main, "body": v_size_small}.get(p_layer.size, p_layer.size)
+                p_style = {"text_rgb": TEXT_RGB, "stroke_rgb": STROKE_RGB, "stroke_w": v_stroke_width, "shadow_off": v_shadow_offset, "pos_x": pos_x, "pos_y": pos_y, **p_layer.overrides}
                 
-                final_preview = draw_text_on_image(
-                    st.session_state.preview_img_cache, 
+                # Same pixels (within 1 LSB) as drawing onto the frame, but the text raster is reused across reruns.
+                # Fast preview composites at display size; the layout is fitted at full resolution and scaled.
+                (src_w, src_h), frame = st.session_state.preview_img_cache
+                scale = min(1.0, PREVIEW_WIDTH / src_w) if fast_preview else 1.0
+                text_sprite, text_pos = render_text_sprite(
+                    src_w,
+                    src_h,
                     p_text, 
                     font_path, 
                     p_size, 
-                    TEXT_RGB, 
-                    STROKE_RGB, 
-                    v_stroke_width, 
-                    v_shadow_offset,
-                    pos_x,
-                    pos_y
+                    p_style["text_rgb"], 
+                    p_style["stroke_rgb"], 
+                    p_style["stroke_w"], 
+                    p_style["shadow_off"],
+                    p_style["pos_x"],
+                    p_style["pos_y"],
+                    scale
                 )
+                size = scaled_size(src_w, src_h, scale)
+                if frame.size != size:
+                    frame = frame.resize(size, Image.BILINEAR)
+                final_preview = frame.convert("RGBA")
+                final_preview.alpha_composite(text_sprite, dest=text_pos)
                 
                 st.image(final_preview, caption=f"Previewing: {preview_layer}", width=300)
             else:
@@ -524,20 +442,18 @@ if uploaded_zip and uploaded_csv:
         # --- BATCH RENDER SECTION ---
         st.markdown("---")
         st.subheader("🚀 BATCH PROCESSING")
-        if st.button("RENDER ALL VIDEOS"):
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
+        job_status = render_queue.status(st.session_state.render_job) if st.session_state.get("render_job") else None
+        job_running = bool(job_status) and job_status["state"] not in render_queue.FINISHED_STATES
+        if st.button("RENDER ALL VIDEOS", disabled=job_running):
             output_dir = os.path.join(st.session_state.temp_dir, "output")
             os.makedirs(output_dir, exist_ok=True)
             
-            results = []
-            files_to_zip = []
+            skipped = []
+            outputs = []
+            # The worker gets plain values only: overrides are folded into each row copy, style is passed explicitly.
+            job_col_map = {**col_map, 'filename': col_map['filename'] or 'Filename', 'venue': col_map['venue'] or 'Venue'}
+            venue_override = None if venue_choice == "Use CSV" else venue_choice
             
-            with zipfile.ZipFile(uploaded_zip, 'r') as z:
-                z.extractall(st.session_state.temp_dir)
-
-            total = len(df)
             for i, r in df.iterrows():
                 c_name = str(r.get(col_map['city'])).replace(" ", "_")
                 mapping = st.session_state.file_map.get(i, {}) or st.session_state.get("default_map", {})
@@ -545,39 +461,25 @@ if uploaded_zip and uploaded_csv:
                 mapped_9x16 = mapping.get("9x16", "")
 
                 if not mapped_1x1 and not mapped_9x16:
-                    results.append(f"{c_name}: ❌ missing 1x1/9x16 mapping")
-                    progress_bar.progress((i + 1) / total)
+                    skipped.append(f"{c_name}: ❌ missing 1x1/9x16 mapping")
                     continue
 
                 for label, fname in [("1x1", mapped_1x1), ("9x16", mapped_9x16)]:
                     if not fname:
-                        results.append(f"{c_name} {label}: ❌ missing mapping")
+                        skipped.append(f"{c_name} {label}: ❌ missing mapping")
                         continue
-                    out_name = f"Promo_{c_name}_{fname}"
-                    out_path = os.path.join(output_dir, out_name)
-                    
-                    status_text.text(f"Rendering {i+1}/{total}: {c_name} ({label})...")
-                    venue_override = None if venue_choice == "Use CSV" else venue_choice
-                    success, msg = render_video(
-                        r,
-                        st.session_state.temp_dir,
-                        font_path,
-                        out_path,
-                        col_map,
-                        filename_override=fname,
-                        venue_override=venue_override
-                    )
-                    
-                    if success: files_to_zip.append(out_path)
-                    results.append(f"{c_name} {label}: {'✅' if success else '❌ ' + msg}")
-                progress_bar.progress((i + 1) / total)
-            
-            st.success("Batch Complete!")
-            st.expander("View Logs").write(results)
+                    out_name = output_name(c_name, fname, draft_render)
+                    row_values = r.to_dict()
+                    row_values[job_col_map['filename']] = fname
+                    if venue_override is not None: row_values[job_col_map['venue']] = venue_override
+                    outputs.append({"label": f"{c_name} {label}", "row": row_values, "out_path": os.path.join(output_dir, out_name)})
             
-            if files_to_zip:
-                zip_out = os.path.join(st.session_state.temp_dir, "Final_Assets.zip")
-                with zipfile.ZipFile(zip_out, 'w') as z:
-                    for f in files_to_zip: z.write(f, os.path.basename(f))
-                with open(zip_out, "rb") as f:
-                    st.download_button("DOWNLOAD ZIP", f, "Tour_Assets.zip")
+            style = {"col_map": job_col_map, "motion_profile": motion_profile, "text_rgb": TEXT_RGB, "stroke_rgb": STROKE_RGB,
+                     "size_main": v_size_main, "size_small": v_size_small, "stroke_w": v_stroke_width, "shadow_off": v_shadow_offset,
+                     "pos_x": pos_x, "pos_y": pos_y, "backend": render_backend, "draft": draft_render, "template": template_spec}
+            _job_id, st.session_state.render_job = render_queue.submit(os.path.join(st.session_state.temp_dir, "jobs"), {
+                "outputs": outputs, "skipped": skipped, "source_zip": st.session_state.zip_source.zip_file, "videos_dir": st.session_state.zip_source.dest_dir, "font_path": font_path,
+                "cache_dir": os.path.join(output_dir, CACHE_DIRNAME), "media_cache_dir": os.path.join(output_dir, media_info.CACHE_DIRNAME), "style": style})
+            job_running = True
+        
+        st.fragment(render_job_panel, run_every=2 if job_running else None)()
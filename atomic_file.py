@@ -0,0 +1,36 @@
+import contextlib
+import os
+import stat
+import tempfile
+
+# os.umask can only be read by setting it; do that once, before any threads start.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="w", suffix=""):
+    """Open a temporary file next to path and rename it over path once the block completes.
+
+    Readers, including other processes and hosts on a shared directory, see
+    the old file or the new one, never a partial write. If the block raises,
+    the temporary file is removed and path is left as it was. Text mode is
+    UTF-8. The file gets path's current mode, or for a new file the mode
+    open() would give it (0o666 less the umask), not mkstemp's 0o600.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=suffix, dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        try:
+            file_mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            file_mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, file_mode)
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
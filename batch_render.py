@@ -1,19 +1,61 @@
 import argparse
+import collections
+import concurrent.futures
+import cProfile
+import gc
 import os
 import shutil
+import sys
 import tempfile
-import zipfile
-import subprocess
 
 import numpy as np
 import pandas as pd
-from moviepy.editor import VideoFileClip, ImageClip, CompositeVideoClip
-from PIL import Image, ImageFont, ImageDraw
+from moviepy.editor import VideoFileClip, VideoClip, CompositeVideoClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from PIL import Image, ImageDraw
+
+from ffmpeg_backend import BACKENDS, make_layer, probe_video, render_static_overlays
+from compositor import SpriteLayer, composite, still_layer
+import media_info
+import memory_governor
+from font_fit import font_digest, get_scaled_font, load_font
+from layer_template import compile_template, load_template
+from media_index import find_video_path
+from motion import MOTION_PROFILES, convergence_positions, keyframed_sprite
+from overlay_cache import CACHE_DIRNAME, cached_overlay, configure as configure_overlay_cache, crop_to_sprite
+import render_farm
+from render_manifest import MANIFEST_NAME, RenderManifest, fingerprint, link_output
+from render_stats import PROFILE_DIRNAME, STATS_NAME, RenderStats, append_records, format_summary
+from zip_source import ZipSource
 
 # --- COMPATIBILITY PATCH ---
 if not hasattr(Image, "ANTIALIAS"):
     Image.ANTIALIAS = Image.LANCZOS
 
+# VideoFileClip parses each source through the metadata cache instead of on every open.
+media_info.install()
+
+# Per-process scratch directory, set by _init_worker in --jobs mode.
+_WORKER_TEMP_DIR = None
+
+# Encoder settings shared by render_video and render_group; part of each
+# output's manifest fingerprint.
+ENCODER_SETTINGS = {"codec": "libx264", "audio_codec": "aac", "fps": 24, "preset": "ultrafast"}
+
+# --draft proofs: frames are decoded, composited and encoded at this fraction
+# of the source size and at this frame rate. Text is still fitted against the
+# full-size frame and then scaled, so line breaks and font sizes match the
+# final render.
+DRAFT_SETTINGS = {"scale": 0.5, "fps": 12}
+
+# Drafts are written next to final renders under their own names (and so
+# their own manifest entries); a proof never replaces a finished output.
+DRAFT_SUFFIX = "_draft"
+
+# The batch's text style, in render_text_sprite's argument order; template
+# layers override individual entries (TemplateLayer.overrides).
+STYLE_KEYS = ("text_rgb", "stroke_rgb", "stroke_w", "shadow_off", "pos_x", "pos_y")
+
 
 def hex_to_rgb(h):
     h = h.lstrip("#")
@@ -27,57 +69,11 @@ def get_col(df, options):
     return None
 
 
-def get_duration_ffprobe(filepath):
-    try:
-        cmd = [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            filepath,
-        ]
-        return float(subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode().strip())
-    except Exception:
-        return None
-
-
-def find_video_path(root_dir, filename):
-    direct = os.path.join(root_dir, filename)
-    if os.path.exists(direct):
-        return direct
-    for root, _dirs, files in os.walk(root_dir):
-        for f in files:
-            if f == filename:
-                return os.path.join(root, f)
-    return direct
-
-
-def get_scaled_font(text, font_path, max_size, target_width, target_height, stroke_w=0, spacing=-12):
-    size = max_size
-    try:
-        font = ImageFont.truetype(font_path, int(size)) if font_path else ImageFont.load_default()
-    except Exception:
-        return ImageFont.load_default(), size
-
-    dummy = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
-    for s in range(int(max_size), 20, -2):
-        test_font = ImageFont.truetype(font_path, s) if font_path else font
-        bbox = dummy.textbbox(
-            (0, 0),
-            text,
-            font=test_font,
-            spacing=spacing,
-            stroke_width=stroke_w,
-            align="center",
-        )
-        text_w = bbox[2] - bbox[0]
-        text_h = bbox[3] - bbox[1]
-        if text_w <= target_width and text_h <= target_height:
-            return test_font, s
-    return font, size
+def scaled_size(w, h, scale):
+    """Return the (even, for yuv420p) frame size of a w x h source rendered at scale."""
+    if scale == 1.0:
+        return w, h
+    return max(2, round(w * scale / 2) * 2), max(2, round(h * scale / 2) * 2)
 
 
 def draw_text_on_image(
@@ -91,14 +87,17 @@ def draw_text_on_image(
     shadow_off,
     offset_x=0,
     offset_y=0,
+    scale=1.0,
 ):
+    # scale < 1 draws the full-resolution layout on a base_img downscaled by scale: the font is fitted
+    # against the full-size frame, then size, stroke, shadow, offsets and line spacing are all scaled.
     img = base_img.copy().convert("RGBA")
     draw = ImageDraw.Draw(img)
     w, h = img.size
 
-    target_w = w * 0.85
-    target_h = h * 0.85
-    font, _final_size = get_scaled_font(
+    target_w = w / scale * 0.85
+    target_h = h / scale * 0.85
+    font, final_size = get_scaled_font(
         text,
         font_path,
         font_size,
@@ -107,6 +106,11 @@ def draw_text_on_image(
         stroke_w=stroke_w,
         spacing=-12,
     )
+    spacing = -12
+    if scale != 1.0:
+        font = scale_font(font, font_path, final_size, scale)
+        stroke_w, shadow_off = round(stroke_w * scale), round(shadow_off * scale)
+        offset_x, offset_y, spacing = offset_x * scale, offset_y * scale, spacing * scale
 
     bbox = draw.textbbox(
         (0, 0),
@@ -114,7 +118,7 @@ def draw_text_on_image(
         font=font,
         align="center",
         stroke_width=stroke_w,
-        spacing=-12,
+        spacing=spacing,
     )
     text_w = bbox[2] - bbox[0]
     text_h = bbox[3] - bbox[1]
@@ -129,7 +133,7 @@ def draw_text_on_image(
             font=font,
             fill=stroke,
             align="center",
-            spacing=-12,
+            spacing=spacing,
         )
 
     draw.text(
@@ -140,7 +144,97 @@ def draw_text_on_image(
         align="center",
         stroke_width=stroke_w,
         stroke_fill=stroke,
-        spacing=-12,
+        spacing=spacing,
+    )
+    return img
+
+
+def scale_font(font, font_path, size, scale):
+    """Return font at size * scale, or font itself when it is not a loadable TrueType file."""
+    if not font_path:
+        return font
+    try:
+        return load_font(font_path, max(1, round(size * scale)))
+    except Exception:
+        return font
+
+
+def render_text_sprite(
+    w,
+    h,
+    text,
+    font_path,
+    font_size,
+    color,
+    stroke,
+    stroke_w,
+    shadow_off,
+    offset_x=0,
+    offset_y=0,
+    scale=1.0,
+):
+    """Return (sprite, (x, y)): draw_text_on_image on a blank w x h canvas, cropped to the text.
+
+    Goes through the overlay cache, so the sprite is shared and read-only.
+    With scale < 1 the canvas is the w x h frame at scaled_size, for drafts.
+    """
+    fields = {
+        "kind": "text",
+        "canvas": (w, h),
+        "text": text,
+        "size": font_size,
+        "color": color,
+        "stroke": stroke,
+        "stroke_w": stroke_w,
+        "shadow": shadow_off,
+        "offset": (offset_x, offset_y),
+    }
+    if scale != 1.0:
+        fields["scale"] = scale
+    return cached_overlay(
+        fields,
+        lambda: crop_to_sprite(
+            draw_text_on_image(
+                Image.new("RGBA", scaled_size(w, h, scale)),
+                text,
+                font_path,
+                font_size,
+                color,
+                stroke,
+                stroke_w,
+                shadow_off,
+                offset_x,
+                offset_y,
+                scale,
+            )
+        ),
+        font_path,
+    )
+
+
+def draw_line_sprite(line, font, text_rgb, stroke_rgb, stroke_w, shadow_off, pad=40):
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    bbox = draw.textbbox((0, 0), line, font=font, align="center", stroke_width=stroke_w)
+    w, h = int((bbox[2] - bbox[0]) + 2 * pad), int((bbox[3] - bbox[1]) + 2 * pad)
+    img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    pos = (int(pad - bbox[0]), int(pad - bbox[1]))
+    if shadow_off > 0:
+        draw.text(
+            (pos[0] + shadow_off, pos[1] + shadow_off),
+            line,
+            font=font,
+            fill=stroke_rgb,
+            align="center",
+        )
+    draw.text(
+        pos,
+        line,
+        font=font,
+        fill=text_rgb,
+        align="center",
+        stroke_width=stroke_w,
+        stroke_fill=stroke_rgb,
     )
     return img
 
@@ -159,12 +253,19 @@ def create_split_convergence(
     shadow_off,
     offset_x=0,
     offset_y=0,
+    fps=24,
+    scale=1.0,
 ):
+    """Return one SpriteLayer per line, sliding in from alternating sides over 0.5 s.
+
+    video_w x video_h is the full-size frame; with scale < 1 the lines move
+    across that frame at scaled_size, laid out as in the full render.
+    """
     lines = text.split("\n")
-    clips = []
+    layers = []
     target_w = video_w * 0.85
     target_h = video_h * 0.85
-    font, _final_size = get_scaled_font(
+    font, final_size = get_scaled_font(
         text,
         font_path,
         font_size,
@@ -173,61 +274,185 @@ def create_split_convergence(
         stroke_w=stroke_w,
         spacing=-12,
     )
+    line_gap, pad = 20, 40
+    if scale != 1.0:
+        font = scale_font(font, font_path, final_size, scale)
+        stroke_w, shadow_off = round(stroke_w * scale), round(shadow_off * scale)
+        offset_x, offset_y, line_gap, pad = offset_x * scale, offset_y * scale, line_gap * scale, round(pad * scale)
+        video_w, video_h = scaled_size(video_w, video_h, scale)
 
     dummy_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
     line_heights = []
     for line in lines:
         bbox = dummy_draw.textbbox((0, 0), line, font=font, stroke_width=stroke_w)
-        line_heights.append((bbox[3] - bbox[1]) + 20)
+        line_heights.append((bbox[3] - bbox[1]) + line_gap)
 
     total_h = sum(line_heights)
     start_y_cursor = ((video_h / 2) - (total_h / 2)) + offset_y
 
     for i, line in enumerate(lines):
-        dummy_img = Image.new("RGBA", (1, 1))
-        draw = ImageDraw.Draw(dummy_img)
-        bbox = draw.textbbox((0, 0), line, font=font, align="center", stroke_width=stroke_w)
-        w, h = int((bbox[2] - bbox[0]) + 80), int((bbox[3] - bbox[1]) + 80)
-        img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        pos = (int(40 - bbox[0]), int(40 - bbox[1]))
-        if shadow_off > 0:
-            draw.text(
-                (pos[0] + shadow_off, pos[1] + shadow_off),
-                line,
-                font=font,
-                fill=stroke_rgb,
-                align="center",
-            )
-        draw.text(
-            pos,
-            line,
-            font=font,
-            fill=text_rgb,
-            align="center",
-            stroke_width=stroke_w,
-            stroke_fill=stroke_rgb,
+        fields = {
+            "kind": "line",
+            "text": line,
+            "size": getattr(font, "size", None),
+            "color": text_rgb,
+            "stroke": stroke_rgb,
+            "stroke_w": stroke_w,
+            "shadow": shadow_off,
+        }
+        if scale != 1.0:
+            fields["pad"] = pad
+        img, _ = cached_overlay(
+            fields,
+            lambda line=line: (draw_line_sprite(line, font, text_rgb, stroke_rgb, stroke_w, shadow_off, pad), (0, 0)),
+            font_path,
         )
-
-        line_clip = ImageClip(np.array(img)).set_duration(duration).set_start(start_time)
+        w = img.width
 
         final_y = start_y_cursor
         start_y_cursor += line_heights[i]
 
         final_x = ((video_w / 2) - (w / 2)) + offset_x
         start_x = -w if i % 2 == 0 else video_w
+        first_frame, positions = convergence_positions(start_x, final_x, final_y, start_time, duration, fps)
+        layers.append(SpriteLayer(img, positions, first_frame, fps, start_time, duration))
+    return layers
+
+
+def build_template_layer(
+    layer,
+    text,
+    motion,
+    font_size,
+    start,
+    duration,
+    w,
+    h,
+    font_path,
+    text_rgb,
+    stroke_rgb,
+    stroke_w,
+    shadow_off,
+    pos_x,
+    pos_y,
+    scale=1.0,
+    fps=24,
+):
+    """Return the overlay layers (one, or one per line for Split Convergence) for one template layer."""
+    if motion == "Split Convergence":
+        return create_split_convergence(
+            text,
+            font_path,
+            font_size,
+            w,
+            h,
+            duration,
+            start,
+            text_rgb,
+            stroke_rgb,
+            stroke_w,
+            shadow_off,
+            pos_x,
+            pos_y,
+            fps=fps,
+            scale=scale,
+        )
+    sprite, position = render_text_sprite(
+        w,
+        h,
+        text,
+        font_path,
+        font_size,
+        text_rgb,
+        stroke_rgb,
+        stroke_w,
+        shadow_off,
+        pos_x,
+        pos_y,
+        scale=scale,
+    )
+    if motion in MOTION_PROFILES:
+        return [keyframed_sprite(sprite, position, motion, start, duration, scaled_size(w, h, scale), fps)]
+    return [still_layer(sprite, position, start, duration, fps, fade_in=layer.fade_in, fade_out=layer.fade_out)]
+
+
+def build_overlay_layers(
+    row,
+    w,
+    h,
+    dur,
+    font_path,
+    col_map,
+    motion_profile,
+    text_rgb,
+    stroke_rgb,
+    size_main,
+    size_small,
+    stroke_w,
+    shadow_off,
+    pos_x,
+    pos_y,
+    scale=1.0,
+    fps=24,
+    template=None,
+):
+    """Return the overlay layers for one row, in drawing order, from template (None: the default layout).
+
+    w x h is the full-size frame; the layers are laid out on it at
+    scaled_size. Layers whose text uses no CSV field are built once per
+    frame size and duration and shared by every row.
+    """
+    compiled = compile_template(template)
+    batch_style = dict(zip(STYLE_KEYS, (text_rgb, stroke_rgb, stroke_w, shadow_off, pos_x, pos_y)))
+    sizes = {"title": size_main, "body": size_small}
+    try:
+        font = font_digest(font_path) if font_path else None
+    except OSError:
+        font = None
+    layers = []
+    for n, (layer, text, motion) in enumerate(
+        zip(compiled.layers, compiled.texts(row, col_map), compiled.motions(motion_profile))
+    ):
+        style = {**batch_style, **layer.overrides}
+        start, duration = layer.window(dur)
+        args = (layer, text, motion, sizes.get(layer.size, layer.size), start, duration, w, h, font_path)
+
+        def build(args=args, style=style):
+            return build_template_layer(*args, scale=scale, fps=fps, **style)
+
+        if layer.fields:
+            layers += build()
+        else:
+            key = (n, w, h, dur, scale, fps, font, motion, size_main, size_small, tuple(sorted(style.items())))
+            layers += compiled.static_layer(key, build)
+    return layers
+
+
+def open_source(video_path, scale=1.0):
+    """Return (clip, w, h): video_path as a VideoFileClip and its full-resolution size.
+
+    With scale < 1 ffmpeg decodes the frames already downscaled to scaled_size,
+    which is far cheaper than resizing full-size frames afterwards.
+    """
+    if scale == 1.0:
+        clip = VideoFileClip(video_path)
+        w, h = clip.size
+    else:
+        w, h, _dur, _has_audio = probe_video(video_path)
+        draft_w, draft_h = scaled_size(w, h, scale)
+        clip = VideoFileClip(video_path, target_resolution=(draft_h, draft_w))
+    if not clip.duration:
+        clip.duration = 10.0
+    return clip, w, h
 
-        def pos_func(t, sx=start_x, fx=final_x, fy=final_y, st=start_time):
-            rel_t = t - st
-            if rel_t < 0:
-                return (sx, fy)
-            progress = min(1, rel_t / 0.5)
-            ease = 1 - (1 - progress) ** 4
-            curr_x = sx + (fx - sx) * ease
-            return (curr_x, fy)
 
-        clips.append(line_clip.set_position(pos_func))
-    return CompositeVideoClip(clips, size=(video_w, video_h)).set_duration(duration).set_start(start_time)
+def temp_audio_path(temp_dir, output_path):
+    # MoviePy writes its temp audio next to the cwd unless told otherwise;
+    # keep it in the caller's scratch dir so parallel renders never collide.
+    if not temp_dir:
+        return None
+    stem = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(temp_dir, f"{stem}_TEMP_audio.m4a")
 
 
 def render_video(
@@ -245,115 +470,119 @@ def render_video(
     shadow_off,
     pos_x,
     pos_y,
+    temp_dir=None,
+    backend="moviepy",
+    draft=False,
+    stats=None,
+    template=None,
 ):
+    """Render one output; returns (success, msg). stats, a RenderStats, is filled with stage times."""
+    stats = stats or RenderStats()
     filename = str(row.get(col_map["filename"])).strip()
-    video_full_path = find_video_path(videos_dir, filename)
+    with stats.stage("extract"):
+        video_full_path = find_video_path(videos_dir, filename)
+    compiled = compile_template(template)
+    use_ffmpeg = backend == "ffmpeg" and not compiled.animated(motion_profile)
+    scale, fps = (DRAFT_SETTINGS["scale"], DRAFT_SETTINGS["fps"]) if draft else (1.0, ENCODER_SETTINGS["fps"])
 
     clip = None
     try:
-        clip = VideoFileClip(video_full_path)
-        if not clip.duration:
-            clip.duration = get_duration_ffprobe(video_full_path) or 10.0
+        if use_ffmpeg:
+            with stats.stage("probe"):
+                w, h, dur, has_audio = probe_video(video_full_path)
+                dur = dur or 10.0
+            sizes = {"title": size_main, "body": size_small}
+            batch_style = (text_rgb, stroke_rgb, stroke_w, shadow_off, pos_x, pos_y)
+            layers = []
+            with stats.stage("overlays"):
+                for layer, content in zip(compiled.layers, compiled.texts(row, col_map)):
+                    style = dict(zip(STYLE_KEYS, batch_style), **layer.overrides)
+                    start, duration = layer.window(dur)
+                    sprite, position = render_text_sprite(
+                        w,
+                        h,
+                        content,
+                        font_path,
+                        sizes.get(layer.size, layer.size),
+                        *(style[key] for key in STYLE_KEYS),
+                        scale=scale,
+                    )
+                    layers.append(
+                        make_layer(
+                            sprite,
+                            start,
+                            start + duration,
+                            fade_in=layer.fade_in,
+                            fade_out=layer.fade_out,
+                            position=position,
+                        )
+                    )
+            with stats.stage("ffmpeg"):
+                stats.frames = render_static_overlays(
+                    video_full_path,
+                    output_path,
+                    layers,
+                    dur,
+                    fps=fps,
+                    has_audio=has_audio,
+                    temp_dir=temp_dir,
+                    size=scaled_size(w, h, scale) if draft else None,
+                )
+            return True, "Success"
 
-        w, h = clip.size
-        dur = clip.duration
-        t1_dur, t2_start = dur * 0.25, dur * 0.25
-        t2_dur, t3_start = dur * 0.55, dur * 0.80
-        t3_dur = dur * 0.20
-
-        # Intro
-        txt1_img = draw_text_on_image(
-            Image.new("RGBA", (w, h)),
-            "LAWRENCE\nWITH JACOB JEFFRIES",
-            font_path,
-            size_main,
-            text_rgb,
-            stroke_rgb,
-            stroke_w,
-            shadow_off,
-            pos_x,
-            pos_y,
-        )
-        txt1 = ImageClip(np.array(txt1_img)).set_duration(t1_dur).set_position("center").crossfadeout(0.2)
-
-        # Middle
-        city = str(row.get(col_map["city"], "Unknown")).upper()
-        content2 = f"{row.get('Date','')}\n{city}\n{row.get('Venue','')}".upper()
-        if motion_profile == "Split Convergence":
-            txt2 = create_split_convergence(
-                content2,
-                font_path,
-                size_small,
+        with stats.stage("probe"):
+            clip, w, h = open_source(video_full_path, scale)
+        with stats.stage("overlays"):
+            overlays = build_overlay_layers(
+                row,
                 w,
                 h,
-                t2_dur,
-                t2_start,
-                text_rgb,
-                stroke_rgb,
-                stroke_w,
-                shadow_off,
-                pos_x,
-                pos_y,
-            )
-        else:
-            base_img = Image.new("RGBA", (w, h))
-            overlay = draw_text_on_image(
-                base_img,
-                content2,
-                font_path,
-                size_small,
-                text_rgb,
-                stroke_rgb,
-                stroke_w,
-                shadow_off,
-                pos_x,
-                pos_y,
-            )
-            txt2 = ImageClip(np.array(overlay)).set_duration(t2_dur).set_position("center").set_start(t2_start).crossfadein(0.2)
-
-        # Outro
-        content3 = f"TICKETS ON SALE NOW\n{row.get('Ticket_Link','')}".upper()
-        if motion_profile == "Split Convergence":
-            txt3 = create_split_convergence(
-                content3,
+                clip.duration,
                 font_path,
-                size_small,
-                w,
-                h,
-                t3_dur,
-                t3_start,
+                col_map,
+                motion_profile,
                 text_rgb,
                 stroke_rgb,
-                stroke_w,
-                shadow_off,
-                pos_x,
-                pos_y,
-            )
-        else:
-            overlay3 = draw_text_on_image(
-                Image.new("RGBA", (w, h)),
-                content3,
-                font_path,
+                size_main,
                 size_small,
-                text_rgb,
-                stroke_rgb,
                 stroke_w,
                 shadow_off,
                 pos_x,
                 pos_y,
+                scale=scale,
+                fps=fps,
+                template=template,
             )
-            txt3 = ImageClip(np.array(overlay3)).set_duration(t3_dur).set_position("center").set_start(t3_start)
-
-        final = CompositeVideoClip([clip, txt1, txt2, txt3])
-        final.write_videofile(
-            output_path,
-            codec="libx264",
-            audio_codec="aac",
-            fps=24,
-            preset="ultrafast",
-            verbose=False,
-            logger=None,
+
+        # write_videofile runs with logger=None, so its work is attributed through
+        # the callbacks it makes: the audio export, the source decode and the
+        # per-frame composite. What remains of the write is x264 and the pipe.
+        clip.make_frame = stats.timed("decode", clip.make_frame)
+        canvas = np.empty((clip.h, clip.w, 3), dtype=np.uint8)
+        final = VideoClip(duration=max([clip.duration] + [layer.end for layer in overlays]))
+        final.size = clip.size
+        final.make_frame = stats.timed(
+            "composite",
+            lambda t: composite(clip.get_frame(t) if clip.is_playing(t) else None, overlays, t, canvas),
+            count_frames=True,
         )
+        # Mixed the way a CompositeVideoClip would, like render_group's shared audio.
+        final.audio = CompositeVideoClip([clip]).audio
+        if final.audio is not None:
+            final.audio.write_audiofile = stats.timed("audio", final.audio.write_audiofile)
+        with stats.stage("encode"):
+            final.write_videofile(
+                output_path,
+                codec="libx264",
+                audio_codec="aac",
+                fps=fps,
+                preset="ultrafast",
+                temp_audiofile=temp_audio_path(temp_dir, output_path),
+                verbose=False,
+                logger=None,
+            )
+        stats.exclude("encode", "composite", "audio")
+        stats.exclude("composite", "decode")
         clip.close()
         return True, "Success"
     except Exception as e:
@@ -362,7 +591,447 @@ def render_video(
         return False, str(e)
 
 
-def main():
+def render_group(
+    jobs,
+    video_path,
+    font_path,
+    col_map,
+    motion_profile,
+    text_rgb,
+    stroke_rgb,
+    size_main,
+    size_small,
+    stroke_w,
+    shadow_off,
+    pos_x,
+    pos_y,
+    temp_dir=None,
+    fps=24,
+    draft=False,
+    stats=None,
+    template=None,
+):
+    """Decode video_path once and composite/encode every job's output from the same frames.
+
+    Each job gets its own overlay composite and its own x264 writer; the source
+    frame for time t is decoded a single time and handed to all of them. Returns
+    (index, city, success, msg) per job, in job order. stats covers the whole
+    group, since decode and audio are shared.
+    """
+    stats = stats or RenderStats()
+    results = {}
+    writers = {}
+    clip = None
+    audiofile = None
+    scale = 1.0
+    if draft:
+        scale, fps = DRAFT_SETTINGS["scale"], DRAFT_SETTINGS["fps"]
+    try:
+        with stats.stage("probe"):
+            clip, w, h = open_source(video_path, scale)
+        dur = clip.duration
+
+        # Overlays do not touch the audio, so every output shares one encode of it.
+        # Taken from a composite so it is padded exactly like render_video's output.
+        audio = CompositeVideoClip([clip]).audio
+        if audio is not None:
+            stem = os.path.splitext(os.path.basename(video_path))[0]
+            audiofile = os.path.join(temp_dir or tempfile.gettempdir(), f"{stem}_{os.getpid()}_TEMP_group_audio.m4a")
+            with stats.stage("audio"):
+                audio.write_audiofile(audiofile, 44100, 4, 2000, "aac", verbose=False, logger=None)
+
+        composites = {}
+        canvases = {}
+        for i, c_name, out_path, r in jobs:
+            try:
+                with stats.stage("overlays"):
+                    overlays = build_overlay_layers(
+                        r,
+                        w,
+                        h,
+                        dur,
+                        font_path,
+                        col_map,
+                        motion_profile,
+                        text_rgb,
+                        stroke_rgb,
+                        size_main,
+                        size_small,
+                        stroke_w,
+                        shadow_off,
+                        pos_x,
+                        pos_y,
+                        scale=scale,
+                        fps=fps,
+                        template=template,
+                    )
+                composites[i] = (overlays, max([dur] + [layer.end for layer in overlays]))
+                canvases[i] = np.empty((clip.h, clip.w, 3), dtype=np.uint8)
+                writers[i] = FFMPEG_VideoWriter(
+                    out_path,
+                    scaled_size(w, h, scale),
+                    fps,
+                    codec="libx264",
+                    preset="ultrafast",
+                    audiofile=audiofile,
+                )
+            except Exception as e:
+                composites.pop(i, None)
+                results[i] = (i, c_name, False, str(e))
+
+        # Same time grid as VideoClip.iter_frames used by write_videofile; the
+        # composite (not the source) duration decides the frame count.
+        grid_end = max([end for _overlays, end in composites.values()], default=0)
+        for t in np.arange(0, grid_end, 1.0 / fps):
+            if not writers:
+                break
+            with stats.stage("decode"):
+                source_frame = clip.get_frame(t) if clip.is_playing(t) else None
+            for i in list(writers):
+                overlays, end = composites[i]
+                if t >= end:
+                    continue
+                try:
+                    with stats.stage("composite"):
+                        frame = composite(source_frame, overlays, t, canvases[i])
+                    with stats.stage("encode"):
+                        writers[i].write_frame(frame)
+                    stats.frames += 1
+                except Exception as e:
+                    writers.pop(i).close()
+                    c_name = next(job[1] for job in jobs if job[0] == i)
+                    results[i] = (i, c_name, False, str(e))
+
+        for i, c_name, _out_path, _r in jobs:
+            if i in writers:
+                with stats.stage("encode"):
+                    writers.pop(i).close()
+                results[i] = (i, c_name, True, "Success")
+    except Exception as e:
+        for i, c_name, _out_path, _r in jobs:
+            results.setdefault(i, (i, c_name, False, str(e)))
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if clip:
+            clip.close()
+        if audiofile and os.path.exists(audiofile):
+            os.remove(audiofile)
+    return [results[job[0]] for job in jobs]
+
+
+def output_name(c_name, fname, draft=False):
+    """Return the output file name for a row's source fname; drafts get DRAFT_SUFFIX before the extension."""
+    if draft:
+        stem, ext = os.path.splitext(fname)
+        fname = f"{stem}{DRAFT_SUFFIX}{ext}"
+    return f"Promo_{c_name}_{fname}"
+
+
+def build_jobs(df, col_map, output_dir, draft=False):
+    jobs = []
+    for i, r in df.iterrows():
+        c_name = str(r.get(col_map["city"], "Unknown")).replace(" ", "_")
+        fname = str(r.get(col_map["filename"]))
+        jobs.append((i, c_name, os.path.join(output_dir, output_name(c_name, fname, draft)), r))
+    return jobs
+
+
+def render_fingerprint(row, videos_dir, font_path, style):
+    """Fingerprint everything that determines a row's output file."""
+    filename = str(row.get(style["col_map"]["filename"])).strip()
+    if isinstance(videos_dir, ZipSource):
+        source = videos_dir.fingerprint(filename)
+    else:
+        path = find_video_path(videos_dir, filename)
+        st = os.stat(path) if os.path.exists(path) else None
+        source = st and {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    try:
+        font = font_digest(font_path) if font_path else None
+    except OSError:
+        font = None
+    return fingerprint(
+        {
+            "source": source,
+            "texts": compile_template(style.get("template")).texts(row, style["col_map"]),
+            "font": font,
+            "style": {k: v for k, v in style.items() if k not in ("col_map", "draft")},
+            "encoder": {**ENCODER_SETTINGS, "draft": DRAFT_SETTINGS} if style.get("draft") else ENCODER_SETTINGS,
+        }
+    )
+
+
+def plan_jobs(jobs, videos_dir, render_args, manifest):
+    """Split jobs into (to_render, up_to_date, copies, digests).
+
+    Jobs whose output the manifest still vouches for are up to date. Among the
+    rest, a job with the same fingerprint as an earlier one is a copy: it maps
+    to the index of the job that renders the shared content.
+    """
+    digests, to_render, up_to_date, copies, first = {}, [], [], {}, {}
+    for job in jobs:
+        i, _c_name, out_path, r = job
+        digests[i] = render_fingerprint(r, videos_dir, render_args["font_path"], render_args["style"])
+        if manifest is not None and manifest.is_current(out_path, digests[i]):
+            up_to_date.append(job)
+        elif digests[i] in first:
+            copies[i] = first[digests[i]]
+        else:
+            first[digests[i]] = i
+            to_render.append(job)
+    return to_render, up_to_date, copies, digests
+
+
+def missing_sources(jobs, videos_dir, col_map):
+    """Return {index: message} for jobs whose source video does not exist.
+
+    Checked against the zip listing or the file system, so nothing is
+    extracted or opened.
+    """
+    missing = {}
+    for i, _c_name, _out_path, r in jobs:
+        filename = str(r.get(col_map["filename"])).strip()
+        if isinstance(videos_dir, ZipSource):
+            found = videos_dir.find(filename) is not None
+        else:
+            found = os.path.exists(find_video_path(videos_dir, filename))
+        if not found:
+            missing[i] = f"{filename} not found"
+    return missing
+
+
+def _init_worker(scratch_root, cache_dir=None, media_cache_dir=None):
+    global _WORKER_TEMP_DIR
+    _WORKER_TEMP_DIR = tempfile.mkdtemp(prefix="worker_", dir=scratch_root)
+    configure_overlay_cache(cache_dir)
+    media_info.configure(media_cache_dir)
+
+
+def build_tasks(jobs, videos_dir, col_map, group_size=0):
+    """Split jobs into render tasks.
+
+    Without grouping every job is its own task. With group_size > 0, jobs that
+    resolve to the same source video are batched (at most group_size per task)
+    so render_group can decode that source once for all of them.
+    """
+    if group_size <= 0:
+        return [[job] for job in jobs]
+    by_source = {}
+    for job in jobs:
+        filename = str(job[3].get(col_map["filename"])).strip()
+        # Group zip members by name so planning does not extract anything.
+        if isinstance(videos_dir, ZipSource):
+            source = videos_dir.find(filename) or filename
+        else:
+            source = find_video_path(videos_dir, filename)
+        by_source.setdefault(source, []).append(job)
+    tasks = []
+    for source_jobs in by_source.values():
+        for k in range(0, len(source_jobs), group_size):
+            tasks.append(source_jobs[k : k + group_size])
+    return tasks
+
+
+def overlay_count(row, col_map, motion_profile, template=None):
+    """Return how many overlay layers a row gets: one per template layer, or one per line for Split Convergence."""
+    compiled = compile_template(template)
+    return sum(
+        len(text.split("\n")) if motion == "Split Convergence" else 1
+        for text, motion in zip(compiled.texts(row, col_map), compiled.motions(motion_profile))
+    )
+
+
+def task_footprint(task, videos_dir, render_args):
+    """Return the projected peak memory of a render task in bytes, from its source size and overlays.
+
+    Runs in the coordinator before the task is admitted, so it never extracts
+    a zip member: stored members and sources on disk are probed in place,
+    deflated ones are assumed to be 1080x1920.
+    """
+    style = render_args["style"]
+    filename = str(task[0][3].get(style["col_map"]["filename"])).strip()
+    if isinstance(videos_dir, ZipSource):
+        path = videos_dir.peek_path(filename)
+    else:
+        path = find_video_path(videos_dir, filename)
+    w, h = 1080, 1920
+    if path:
+        try:
+            info = media_info.probe(path)
+            w, h = info["width"] or w, info["height"] or h
+        except (IOError, OSError):
+            pass
+    template = style.get("template")
+    grouped = len(task) > 1 and not (
+        style.get("backend") == "ffmpeg" and not compile_template(template).animated(style["motion_profile"])
+    )
+    jobs = task if grouped else task[:1]
+    return memory_governor.estimate_footprint(
+        w,
+        h,
+        overlays=sum(overlay_count(r, style["col_map"], style["motion_profile"], template) for _i, _c, _o, r in jobs),
+        outputs=len(jobs),
+        scale=DRAFT_SETTINGS["scale"] if style.get("draft") else 1.0,
+    )
+
+
+def _profiled(profile_path, fn, *args, **kwargs):
+    """Call fn, saving cProfile data to profile_path when one is given."""
+    if not profile_path:
+        return fn(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        profiler.dump_stats(profile_path)
+
+
+def _profile_path(render_args, out_path):
+    profile_dir = render_args.get("profile_dir")
+    if not profile_dir:
+        return None
+    return os.path.join(profile_dir, os.path.splitext(os.path.basename(out_path))[0] + ".prof")
+
+
+def _render_task(task, videos_dir, render_args):
+    style = dict(render_args["style"])
+    backend = style.pop("backend", "moviepy")
+    use_ffmpeg = backend == "ffmpeg" and not compile_template(style.get("template")).animated(style["motion_profile"])
+    fields = {
+        "motion": style["motion_profile"],
+        "backend": "ffmpeg" if use_ffmpeg else "moviepy",
+        "draft": bool(style.get("draft")),
+    }
+    if len(task) > 1 and not use_ffmpeg:
+        # One record for the whole group, reported with its first job.
+        stats = RenderStats()
+        filename = str(task[0][3].get(style["col_map"]["filename"])).strip()
+        with stats.stage("extract"):
+            video_path = find_video_path(videos_dir, filename)
+        profile_path = _profile_path(render_args, task[0][2])
+        with memory_governor.PeakRSS() as peak:
+            results = _profiled(
+                profile_path,
+                render_group,
+                task,
+                video_path,
+                render_args["font_path"],
+                temp_dir=_WORKER_TEMP_DIR,
+                stats=stats,
+                **style,
+            )
+        record = stats.record(
+            output=os.path.basename(task[0][2]),
+            group=[os.path.basename(job[2]) for job in task],
+            ok=all(result[2] for result in results),
+            peak_rss_mb=round(peak.peak / memory_governor.MB, 1),
+            **fields,
+        )
+        if profile_path:
+            record["profile"] = profile_path
+        # MoviePy clips hold reference cycles; without a collection a worker
+        # keeps the last render's frame buffers and starts the next on top of them.
+        gc.collect()
+        return [result + (record if n == 0 else None,) for n, result in enumerate(results)]
+
+    results = []
+    for i, c_name, out_path, r in task:
+        stats = RenderStats()
+        profile_path = _profile_path(render_args, out_path)
+        with memory_governor.PeakRSS() as peak:
+            success, msg = _profiled(
+                profile_path,
+                render_video,
+                r,
+                videos_dir,
+                render_args["font_path"],
+                out_path,
+                temp_dir=_WORKER_TEMP_DIR,
+                backend=backend,
+                stats=stats,
+                **style,
+            )
+        record = stats.record(
+            output=os.path.basename(out_path),
+            ok=success,
+            peak_rss_mb=round(peak.peak / memory_governor.MB, 1),
+            **fields,
+        )
+        if profile_path:
+            record["profile"] = profile_path
+        results.append((i, c_name, success, msg, record))
+        gc.collect()
+    return results
+
+
+def run_jobs(tasks, videos_dir, render_args, n_jobs=1, scratch_root=None, memory_budget=None):
+    """Render tasks and yield (index, city, success, msg, stats record or None) in completion order.
+
+    With n_jobs > 1, tasks start in order as long as a MemoryGovernor projects
+    the renders in flight to fit memory_budget (bytes, default
+    memory_governor.default_budget()), so large sources run fewer at a time
+    instead of pushing the machine into swap.
+    """
+    if n_jobs <= 1:
+        _init_worker(scratch_root, render_args.get("cache_dir"), render_args.get("media_cache_dir"))
+        for task in tasks:
+            yield from _render_task(task, videos_dir, render_args)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_init_worker,
+        initargs=(scratch_root, render_args.get("cache_dir"), render_args.get("media_cache_dir")),
+    ) as pool:
+        governor = memory_governor.MemoryGovernor(memory_budget or memory_governor.default_budget())
+        queue = collections.deque(tasks)
+        head_estimate = None
+        running = {}
+        while queue or running:
+            while queue and len(running) < n_jobs:
+                if head_estimate is None:
+                    try:
+                        head_estimate = task_footprint(queue[0], videos_dir, render_args)
+                    except Exception as e:
+                        # Fail just this task; its render would hit the same error.
+                        yield from [(i, c_name, False, str(e), None) for i, c_name, _o, _r in queue.popleft()]
+                        continue
+                if not governor.fits(head_estimate):
+                    break
+                fut = pool.submit(_render_task, queue.popleft(), videos_dir, render_args)
+                governor.admit(fut, head_estimate)
+                running[fut] = head_estimate
+                head_estimate = None
+            done, _pending = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                estimate = running.pop(fut)
+                governor.release(fut)
+                results = fut.result()
+                peaks = [record["peak_rss_mb"] for *_result, record in results if record]
+                if peaks:
+                    governor.observe(estimate, max(peaks) * memory_governor.MB)
+                yield from results
+
+
+def worker_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="batch_render.py worker",
+        description="Claim and render jobs from a render farm directory published with --farm.",
+    )
+    parser.add_argument("--farm", required=True, help="Shared farm directory")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between queue scans (default: 1)")
+    parser.add_argument("--heartbeat", type=float, default=5.0, help="Seconds between lease renewals (default: 5)")
+    parser.add_argument("--scratch", default=None, help="Local scratch directory (default: system temp)")
+    args = parser.parse_args(argv)
+    done = render_farm.worker(args.farm, poll=args.poll, heartbeat=args.heartbeat, scratch_dir=args.scratch)
+    print(f"Farm closed; this worker rendered {done} job(s).")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["worker"]:
+        return worker_main(argv[1:])
+
     parser = argparse.ArgumentParser(description="Batch render promo videos from a zip and CSV.")
     parser.add_argument("--zip", required=True, help="Path to input ZIP containing videos")
     parser.add_argument("--csv", required=True, help="Path to input CSV")
@@ -377,7 +1046,80 @@ def main():
     parser.add_argument("--shadow", type=int, default=4, help="Shadow offset (default: 4)")
     parser.add_argument("--offset-x", type=int, default=0, help="Horizontal offset (default: 0)")
     parser.add_argument("--offset-y", type=int, default=0, help="Vertical offset (default: 0)")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--template",
+        default=None,
+        help="JSON or YAML layer template (default: the built-in layout; `python layer_template.py` prints it)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="moviepy",
+        help="Render backend; ffmpeg composites Static overlays in one filter graph (default: moviepy)",
+    )
+    parser.add_argument("--jobs", type=int, default=1, help="Parallel render processes, 0 = one per CPU (default: 1)")
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=0,
+        help=(
+            "With --jobs, start renders only while their projected memory fits in this many GB "
+            f"(default: 0 = {memory_governor.DEFAULT_BUDGET_SHARE:.0%}% of this machine's memory)"
+        ),
+    )
+    parser.add_argument(
+        "--group-size",
+        type=int,
+        default=0,
+        help="Decode each shared source once and encode up to N rows from it in one pass (default: 0 = off)",
+    )
+    parser.add_argument(
+        "--no-overlay-cache",
+        action="store_true",
+        help=f"Do not reuse or store rasterized overlays under <output>/{CACHE_DIRNAME}",
+    )
+    parser.add_argument(
+        "--draft",
+        action="store_true",
+        help=(
+            f"Proof render at {DRAFT_SETTINGS['scale']:g}x resolution and {DRAFT_SETTINGS['fps']} fps "
+            f"with the final text layout, saved as *{DRAFT_SUFFIX}.mp4 next to the final renders"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Save cProfile data for every render under <output>/{PROFILE_DIRNAME}",
+    )
+    parser.add_argument(
+        "--farm",
+        default=None,
+        help="Publish jobs to this shared directory and coordinate `batch_render.py worker` processes on any host",
+    )
+    parser.add_argument(
+        "--local-workers",
+        type=int,
+        default=0,
+        help="With --farm, also start N workers on this machine (default: 0)",
+    )
+    parser.add_argument(
+        "--lease-timeout",
+        type=float,
+        default=60.0,
+        help="With --farm, re-queue a job whose worker has not renewed its lease for this many seconds (default: 60)",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="With --farm, fail a job after this many expired leases (default: 3)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=f"Re-render every row even if <output>/{MANIFEST_NAME} says its output is up to date",
+    )
+    args = parser.parse_args(argv)
 
     df = pd.read_csv(args.csv)
     col_map = {
@@ -386,44 +1128,143 @@ def main():
     }
     if not col_map["filename"]:
         raise SystemExit("CSV missing filename column (Filename/File Name/Video/filename).")
+    try:
+        template = load_template(args.template) if args.template else None
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"{args.template}: {e}")
+    col_map.update(compile_template(template).columns(df.columns, col_map))
 
-    text_rgb = hex_to_rgb(args.text_color)
-    stroke_rgb = hex_to_rgb(args.stroke_color)
+    n_jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    memory_budget = int(args.memory_budget * 1024 * memory_governor.MB) or memory_governor.default_budget()
+    render_args = {
+        "font_path": args.font,
+        "cache_dir": None if args.no_overlay_cache else os.path.join(args.output, CACHE_DIRNAME),
+        "media_cache_dir": os.path.join(args.output, media_info.CACHE_DIRNAME),
+        "profile_dir": os.path.abspath(os.path.join(args.output, PROFILE_DIRNAME)) if args.profile else None,
+        "style": {
+            "col_map": col_map,
+            "motion_profile": args.motion,
+            "text_rgb": hex_to_rgb(args.text_color),
+            "stroke_rgb": hex_to_rgb(args.stroke_color),
+            "size_main": args.title_size,
+            "size_small": args.body_size,
+            "stroke_w": args.stroke_width,
+            "shadow_off": args.shadow,
+            "pos_x": args.offset_x,
+            "pos_y": args.offset_y,
+            "backend": args.backend,
+            "draft": args.draft,
+        },
+    }
+    if template is not None:
+        # Only set when given, so manifests from before templates stay valid.
+        render_args["style"]["template"] = template
 
     os.makedirs(args.output, exist_ok=True)
+    if render_args["profile_dir"]:
+        os.makedirs(render_args["profile_dir"], exist_ok=True)
 
     with tempfile.TemporaryDirectory() as temp_dir:
-        with zipfile.ZipFile(args.zip, "r") as z:
-            z.extractall(temp_dir)
+        # Members are extracted (or read in place) only when a render opens them.
+        videos_dir = ZipSource(args.zip, os.path.join(temp_dir, "videos"))
+        scratch_root = os.path.join(temp_dir, "scratch")
+        os.makedirs(scratch_root)
 
-        total = len(df)
-        results = []
-        for i, r in df.iterrows():
-            c_name = str(r.get(col_map["city"], "Unknown")).replace(" ", "_")
-            fname = str(r.get(col_map["filename"]))
-            out_name = f"Promo_{c_name}_{fname}"
-            out_path = os.path.join(args.output, out_name)
-            success, msg = render_video(
-                r,
-                temp_dir,
-                args.font,
-                out_path,
-                col_map,
-                args.motion,
-                text_rgb,
-                stroke_rgb,
-                args.title_size,
-                args.body_size,
-                args.stroke_width,
-                args.shadow,
-                args.offset_x,
-                args.offset_y,
+        duplicates = videos_dir.index.duplicates()
+        for name in sorted({str(f).strip() for f in df[col_map["filename"]]}):
+            paths = duplicates.get(os.path.basename(name).casefold())
+            if paths:
+                print(f"WARNING: {name} matches {len(paths)} files in the zip; using {videos_dir.find(name)}")
+
+        jobs = build_jobs(df, col_map, args.output, draft=args.draft)
+        manifest = RenderManifest(args.output)
+        to_render, up_to_date, copies, digests = plan_jobs(
+            jobs,
+            videos_dir,
+            render_args,
+            None if args.force else manifest,
+        )
+        by_index = {job[0]: job for job in jobs}
+        total = len(jobs)
+        outcomes = {i: (c_name, True, "Up to date") for i, c_name, _out_path, _r in up_to_date}
+        missing = missing_sources(to_render, videos_dir, col_map)
+        for i, msg in missing.items():
+            outcomes[i] = (by_index[i][1], False, msg)
+            manifest.forget(by_index[i][2])
+        for k, src in copies.items():
+            if src in missing:
+                outcomes[k] = (by_index[k][1], False, missing[src])
+        to_render = [job for job in to_render if job[0] not in missing]
+        if up_to_date:
+            print(f"Skipping {len(up_to_date)} up-to-date output(s); rendering {len(to_render)}.", flush=True)
+
+        for _i, _c_name, out_path, _r in to_render:
+            # Encoders truncate in place; unlink first so a hard-linked twin keeps its bytes.
+            if os.path.exists(out_path) and os.stat(out_path).st_nlink > 1:
+                os.remove(out_path)
+
+        tasks = build_tasks(to_render, videos_dir, col_map, args.group_size)
+        stats_path = os.path.join(args.output, STATS_NAME)
+        records = []
+        # Up-to-date, missing and deduplicated rows are settled already; progress counts renders only.
+        rendered = 0
+        if args.farm:
+            outcomes_iter = render_farm.run_farm(
+                args.farm,
+                tasks,
+                args.zip,
+                render_args,
+                local_workers=args.local_workers,
+                lease_timeout=args.lease_timeout,
+                max_attempts=args.max_attempts,
             )
-            results.append(f"{i+1}/{total} {c_name}: {'OK' if success else 'FAIL ' + msg}")
+        else:
+            if n_jobs > 1:
+                print(f"Memory budget: {memory_budget / (1024 * memory_governor.MB):.1f} GB", flush=True)
+            outcomes_iter = run_jobs(tasks, videos_dir, render_args, n_jobs, scratch_root, memory_budget)
+        for i, c_name, success, msg, record in outcomes_iter:
+            if record is not None:
+                records.append(record)
+                append_records(stats_path, [record])
+            out_path = by_index[i][2]
+            if success:
+                manifest.record(out_path, digests[i])
+            else:
+                manifest.forget(out_path)
+            outcomes[i] = (c_name, success, msg)
+            for k in [k for k, src in copies.items() if src == i]:
+                _k, k_name, k_path, _r = by_index[k]
+                if not success:
+                    outcomes[k] = (k_name, False, f"same content as {c_name}, which failed")
+                    continue
+                if k_path == out_path:
+                    outcomes[k] = (k_name, True, f"Deduplicated, same output as {c_name}")
+                    continue
+                link_output(out_path, k_path)
+                manifest.record(k_path, digests[k])
+                outcomes[k] = (k_name, True, f"Linked to {os.path.basename(out_path)}")
+            rendered += 1
+            if n_jobs > 1 or args.farm:
+                print(f"[{rendered}/{len(to_render)} rendered] {c_name}: {'OK' if success else 'FAIL ' + msg}", flush=True)
+
+        results = []
+        for pos, (i, _c_name, _out_path, _r) in enumerate(jobs):
+            c_name, success, msg = outcomes[i]
+            status = ("OK" if msg == "Success" else f"OK ({msg})") if success else "FAIL " + msg
+            results.append(f"{pos+1}/{total} {c_name}: {status}")
 
         for line in results:
             print(line)
 
+        if records:
+            print(f"\nWhere the time went (one JSON line per render in {stats_path}):")
+            for line in format_summary(records):
+                print(line)
+            if render_args["profile_dir"]:
+                print(f"cProfile data: {render_args['profile_dir']}")
+        if args.farm:
+            print(f"Farm report: {os.path.join(render_farm.current_batch(args.farm), render_farm.REPORT_NAME)}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,333 @@
+import argparse
+import csv
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from ffmpeg_backend import BACKENDS
+from motion import ANIMATED_PROFILES
+
+MOTIONS = ["Static", "Cinematic Lift", "Zoom Pop", "Ghost Drift", "Shake", "Split Convergence"]
+ASPECTS = {"1x1": (1, 1), "9x16": (9, 16)}
+
+# City names of different lengths, so text fitting lands on different sizes.
+CITIES = ["Austin", "San Francisco", "Salt Lake City", "New York", "Minneapolis", "St. Louis", "Washington DC", "Boise"]
+
+SOURCE_FPS = 30
+
+
+def frame_size(aspect, short_side):
+    """Return (w, h) for an aspect name with the shorter edge at short_side, rounded to even."""
+    aw, ah = ASPECTS[aspect]
+    unit = short_side / min(aw, ah)
+    return round(aw * unit / 2) * 2, round(ah * unit / 2) * 2
+
+
+def make_master(path, size, duration):
+    """Encode a testsrc + sine master with ffmpeg's lavfi sources; no network or input files needed."""
+    w, h = size
+    cmd = [
+        get_setting("FFMPEG_BINARY"),
+        "-y",
+        "-v",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc=size={w}x{h}:rate={SOURCE_FPS}:duration={duration}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:sample_rate=44100:duration={duration}",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "ultrafast",
+        "-pix_fmt",
+        "yuv420p",
+        "-c:a",
+        "aac",
+        "-shortest",
+        path,
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def build_inputs(work_dir, short_side, durations, rows_per_master):
+    """Write the masters, a zip of them and a tour CSV into work_dir; return (zip_path, csv_path, n_rows).
+
+    Masters are reused across runs with the same settings, so only the first
+    run pays for encoding them.
+    """
+    masters_dir = os.path.join(work_dir, "masters")
+    os.makedirs(masters_dir, exist_ok=True)
+    names = []
+    for aspect in ASPECTS:
+        size = frame_size(aspect, short_side)
+        for duration in durations:
+            name = f"testsrc_{aspect}_{size[0]}x{size[1]}_{duration:g}s.mp4"
+            path = os.path.join(masters_dir, name)
+            if not os.path.exists(path):
+                make_master(path + ".part.mp4", size, duration)
+                os.replace(path + ".part.mp4", path)
+            names.append(name)
+
+    zip_path = os.path.join(work_dir, "masters.zip")
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for name in names:
+            z.write(os.path.join(masters_dir, name), f"masters/{name}")
+
+    csv_path = os.path.join(work_dir, "tour.csv")
+    rows = []
+    for n in range(len(names) * rows_per_master):
+        city = CITIES[n % len(CITIES)]
+        rows.append(
+            {
+                "Filename": names[n % len(names)],
+                "City": city if n < len(CITIES) else f"{city} {n // len(CITIES) + 1}",
+                "Date": f"MAR {n % 28 + 1}",
+                "Venue": f"The Benchmark Hall {n + 1}",
+                "Ticket_Link": f"tickets.example.com/{n + 1}",
+            }
+        )
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return zip_path, csv_path, len(rows)
+
+
+def default_font():
+    """Return a TrueType font from the system font directories, or None."""
+    for pattern in ("/usr/share/fonts/**/DejaVuSans-Bold.ttf", "/usr/share/fonts/**/*.ttf", "/Library/Fonts/*.ttf"):
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if matches:
+            return matches[0]
+    return None
+
+
+def run_case(zip_path, csv_path, font_path, output_dir, motion, backend, args):
+    """Run one batch in a child process and return its measurements."""
+    cmd = [
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_render.py"),
+        "--zip",
+        zip_path,
+        "--csv",
+        csv_path,
+        "--output",
+        output_dir,
+        "--motion",
+        motion,
+        "--backend",
+        backend,
+        "--jobs",
+        str(args.jobs),
+    ]
+    if font_path:
+        cmd += ["--font", font_path]
+    if args.draft:
+        cmd.append("--draft")
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    with proc.stdout:
+        log = proc.stdout.read().decode(errors="replace")
+    # wait4 reports the child's own peak RSS (and that of the ffmpeg processes it reaped).
+    _pid, wait_status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(wait_status)
+
+    outputs = sorted(glob.glob(os.path.join(output_dir, "*.mp4")))
+    frames = 0
+    for path in outputs:
+        infos = ffmpeg_parse_infos(path)
+        frames += infos.get("video_nframes") or 0
+    failed = [line for line in log.splitlines() if ": FAIL " in line]
+    return {
+        "motion": motion,
+        "backend": backend,
+        # Animated profiles always go through MoviePy, whatever --backend says.
+        "effective_backend": "moviepy" if backend == "ffmpeg" and motion in ANIMATED_PROFILES else backend,
+        "exit_code": proc.returncode,
+        "outputs": len(outputs),
+        "failed": len(failed),
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "wall_per_output_s": round(wall / len(outputs), 3) if outputs else None,
+        "fps": round(frames / wall, 2) if wall else None,
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "errors": failed[:5] if failed else ([log.strip().splitlines()[-1]] if proc.returncode and log.strip() else []),
+    }
+
+
+def read_frames(path, shrink=4):
+    """Decode every frame of a video as-is (no fps resampling), downscaled by shrink to keep them in memory."""
+    w, h = ffmpeg_parse_infos(path)["video_size"]
+    w, h = w // shrink // 2 * 2, h // shrink // 2 * 2
+    cmd = [
+        get_setting("FFMPEG_BINARY"),
+        "-v",
+        "error",
+        "-i",
+        path,
+        "-map",
+        "0:v:0",
+        "-fps_mode",
+        "passthrough",
+        "-vf",
+        f"scale={w}:{h}:flags=area",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-",
+    ]
+    data = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+    return np.frombuffer(data, np.uint8).reshape(-1, h, w, 3)
+
+
+def backend_parity(moviepy_dir, ffmpeg_dir):
+    """Compare the two backends' renders of the same rows frame by frame.
+
+    A frame is misaligned when it is closer to a neighbour of its MoviePy
+    counterpart than to the counterpart itself, i.e. the backends picked
+    different source frames for it.
+    """
+    outputs = count_mismatch = misaligned = 0
+    max_diff = 0.0
+    for ref_path in sorted(glob.glob(os.path.join(moviepy_dir, "*.mp4"))):
+        out_path = os.path.join(ffmpeg_dir, os.path.basename(ref_path))
+        if not os.path.exists(out_path):
+            continue
+        ref, out = read_frames(ref_path).astype(np.int16), read_frames(out_path).astype(np.int16)
+        outputs += 1
+        count_mismatch += len(ref) != len(out)
+        for k, frame in enumerate(out[: len(ref)]):
+            diff = np.abs(ref[k] - frame).mean()
+            max_diff = max(max_diff, float(diff))
+            if any(np.abs(ref[j] - frame).mean() < diff for j in (k - 1, k + 1) if 0 <= j < len(ref)):
+                misaligned += 1
+    return {
+        "outputs": outputs,
+        "frame_count_mismatch": count_mismatch,
+        "misaligned_frames": misaligned,
+        "max_mean_diff": round(max_diff, 3),
+    }
+
+
+def compare(results, baseline_path):
+    """Print per-case fps and wall-time ratios against an earlier results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(c["motion"], c["backend"]): c for c in json.load(f)["cases"]}
+    print(f"\nCompared with {baseline_path}:")
+    for case in results["cases"]:
+        old = baseline.get((case["motion"], case["backend"]))
+        if not old or not old.get("fps") or not case.get("fps"):
+            continue
+        print(
+            f"  {case['motion']:<18} {case['backend']:<8} fps x{case['fps'] / old['fps']:.2f}  "
+            f"wall x{case['wall_s'] / old['wall_s']:.2f}  rss x{case['peak_rss_mb'] / old['peak_rss_mb']:.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark batch_render on generated test masters.")
+    parser.add_argument("--out", default="benchmark_results.json", help="Results JSON (default: benchmark_results.json)")
+    parser.add_argument("--work-dir", default=None, help="Keep generated masters here between runs (default: temp dir)")
+    parser.add_argument("--size", type=int, default=720, help="Short edge of the masters in pixels (default: 720)")
+    parser.add_argument(
+        "--durations",
+        type=float,
+        nargs="+",
+        default=[4.0, 8.0],
+        help="Master durations in seconds (default: 4 8)",
+    )
+    parser.add_argument("--rows-per-master", type=int, default=1, help="CSV rows per master (default: 1)")
+    parser.add_argument("--motion", action="append", choices=MOTIONS, help="Motion profile to run (default: all)")
+    parser.add_argument("--backend", action="append", choices=BACKENDS, help="Backend to run (default: all)")
+    parser.add_argument("--jobs", type=int, default=1, help="Passed to batch_render --jobs (default: 1)")
+    parser.add_argument("--draft", action="store_true", help="Benchmark --draft renders")
+    parser.add_argument("--font", default=None, help="Path to .ttf font (default: a system font, if any)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    font_path = args.font or default_font()
+    if not font_path:
+        print("WARNING: no .ttf font found; text uses PIL's default font and skips fitting.")
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="render_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        zip_path, csv_path, n_rows = build_inputs(work_dir, args.size, args.durations, args.rows_per_master)
+        cases = []
+        for motion in args.motion or MOTIONS:
+            for backend in args.backend or BACKENDS:
+                output_dir = os.path.join(work_dir, "out", f"{motion.replace(' ', '_')}_{backend}")
+                shutil.rmtree(output_dir, ignore_errors=True)
+                case = run_case(zip_path, csv_path, font_path, output_dir, motion, backend, args)
+                cases.append(case)
+                print(
+                    f"{motion:<18} {backend:<8} {case['outputs']}/{n_rows} outputs  {case['wall_s']:7.2f} s  "
+                    f"{case['fps'] or 0:7.1f} fps  {case['peak_rss_mb']:7.1f} MB",
+                    flush=True,
+                )
+                for error in case["errors"]:
+                    print(f"    {error}")
+
+        # Static renders go through both pipelines; they should write the same frames.
+        parity = {}
+        for motion in args.motion or MOTIONS:
+            if motion in ANIMATED_PROFILES or not set(BACKENDS) <= set(args.backend or BACKENDS):
+                continue
+            dirs = [os.path.join(work_dir, "out", f"{motion.replace(' ', '_')}_{backend}") for backend in BACKENDS]
+            parity[motion] = check = backend_parity(*dirs)
+            ok = not check["frame_count_mismatch"] and not check["misaligned_frames"]
+            print(
+                f"{motion:<18} parity   {'OK' if ok else 'MISMATCH'}: {check['outputs']} outputs, "
+                f"{check['frame_count_mismatch']} frame count mismatches, {check['misaligned_frames']} misaligned frames, "
+                f"max mean diff {check['max_mean_diff']}"
+            )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {
+            "size": args.size,
+            "durations": args.durations,
+            "rows": n_rows,
+            "jobs": args.jobs,
+            "draft": args.draft,
+            "font": os.path.basename(font_path) if font_path else None,
+        },
+        "cases": cases,
+        "parity": parity,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+    print(f"\nWrote {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
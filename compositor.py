@@ -0,0 +1,139 @@
+import numpy as np
+
+# Fade levels are fixed point: FADE_ONE is fully opaque, 0 is invisible.
+FADE_ONE = 256
+
+
+def premultiply(img):
+    """Return (rgb, alpha) for an RGBA image: premultiplied uint8 RGB (h, w, 3) and uint8 alpha (h, w, 1)."""
+    arr = np.asarray(img, dtype=np.uint8)
+    if arr.shape[2] == 3:
+        return np.ascontiguousarray(arr), np.full(arr.shape[:2] + (1,), 255, dtype=np.uint8)
+    alpha = np.ascontiguousarray(arr[:, :, 3:])
+    rgb = arr[:, :, :3] * alpha.astype(np.uint16)
+    rgb += 127
+    rgb //= 255
+    return rgb.astype(np.uint8), alpha
+
+
+def frame_grid(start, duration, fps):
+    """Return (first_frame, times) for the output frames k / fps inside [start, start + duration)."""
+    first = int(np.ceil(start * fps - 1e-9))
+    last = int(np.ceil((start + duration) * fps - 1e-9))
+    return first, np.arange(first, max(first, last)) / fps
+
+
+def fade_ramp(start, duration, fps, fade_in=0.0, fade_out=0.0):
+    """Return (first_frame, factors): per-frame opacity of a layer with linear fades at either end.
+
+    Same curve as MoviePy's crossfadein/crossfadeout on the frame_grid frames.
+    """
+    first, t = frame_grid(start, duration, fps)
+    ct = t - start
+    factors = np.ones(ct.shape)
+    if fade_in:
+        factors = np.minimum(factors, ct / fade_in)
+    if fade_out:
+        factors = np.minimum(factors, (duration - ct) / fade_out)
+    return first, np.clip(factors, 0.0, 1.0)
+
+
+def fade_levels(factors):
+    """Quantize per-frame opacity factors to FADE_ONE fixed point; None when every frame is opaque."""
+    if factors is None:
+        return None
+    levels = np.round(np.clip(factors, 0.0, 1.0) * FADE_ONE).astype(np.uint32)
+    return None if np.all(levels == FADE_ONE) else levels
+
+
+def blend(frame, rgb, alpha, x, y, level=FADE_ONE):
+    """Composite a premultiplied sprite onto the uint8 frame at (x, y), in place.
+
+    Only the part of the sprite inside the frame is touched, with integer
+    arithmetic: out = rgb + dst * (255 - alpha) / 255 (floored), in uint16,
+    or with a fade level the same sum scaled by level / FADE_ONE in uint32.
+    MoviePy's float64 blit of the straight-alpha sprite floors too, so the two
+    agree to within one code value.
+    """
+    h2, w2 = frame.shape[:2]
+    h1, w1 = rgb.shape[:2]
+    xp1, yp1 = max(0, x), max(0, y)
+    xp2, yp2 = min(w2, x + w1), min(h2, y + h1)
+    if xp1 >= xp2 or yp1 >= yp2 or level <= 0:
+        return frame
+    src = (slice(yp1 - y, yp2 - y), slice(xp1 - x, xp2 - x))
+    dst = frame[yp1:yp2, xp1:xp2]
+    if level >= FADE_ONE:
+        acc = dst.astype(np.uint16)
+        acc *= 255 - alpha[src]
+        acc //= 255
+        acc += rgb[src]
+    else:
+        # Widen before multiplying: NumPy would keep uint8 * scalar in uint8.
+        acc = dst.astype(np.uint32)
+        acc *= 255 * FADE_ONE - alpha[src].astype(np.uint32) * int(level)
+        acc += rgb[src].astype(np.uint32) * (255 * int(level))
+        acc //= 255 * FADE_ONE
+    dst[...] = acc
+    return frame
+
+
+class SpriteLayer:
+    """An overlay drawn from precomputed per-frame tables.
+
+    positions[k] is the (x, y) for output frame first_frame + k; levels[k]
+    (optional) its fade level. variants are premultiplied (rgb, alpha) copies
+    of the sprite, picked per frame by variant_index (default: the sprite
+    itself). The layer is visible for start <= t < start + duration, like a
+    MoviePy clip's is_playing window.
+    """
+
+    def __init__(self, img, positions, first_frame, fps, start, duration, levels=None, variants=None, variant_index=None):
+        self.positions = positions
+        self.first_frame = first_frame
+        self.fps = fps
+        self.start = start
+        self.duration = duration
+        self.end = start + duration
+        self.levels = levels
+        self.variants = variants or [premultiply(img)]
+        self.variant_index = variant_index
+
+    def is_playing(self, t):
+        return self.start <= t < self.end
+
+    def draw(self, frame, t):
+        k = int(round(t * self.fps)) - self.first_frame
+        x, y = _at(self.positions, k)
+        rgb, alpha = self.variants[0 if self.variant_index is None else _at(self.variant_index, k)]
+        level = FADE_ONE if self.levels is None else _at(self.levels, k)
+        return blend(frame, rgb, alpha, int(x), int(y), level)
+
+
+def _at(table, k):
+    # Tables cover the layer's frames; a still layer's positions are a single row.
+    return table[min(max(k, 0), len(table) - 1)]
+
+
+def still_layer(img, position, start, duration, fps, fade_in=0.0, fade_out=0.0):
+    """Return a SpriteLayer holding img at position, optionally faded in and/or out."""
+    first, factors = fade_ramp(start, duration, fps, fade_in, fade_out)
+    positions = np.array([[int(position[0]), int(position[1])]], dtype=np.int64)
+    return SpriteLayer(img, positions, first, fps, start, duration, levels=fade_levels(factors))
+
+
+def composite(frame, layers, t, out):
+    """Copy frame into out (a reusable uint8 buffer) and blend the layers playing at t onto it in place.
+
+    frame is None once the source has stopped playing (the last frame of an
+    output that runs a hair past its source); out then starts black, like
+    CompositeVideoClip's background.
+    """
+    if frame is None:
+        out.fill(0)
+    else:
+        np.copyto(out, frame)
+    for layer in layers:
+        if layer.is_playing(t):
+            layer.draw(out, t)
+    return out
@@ -0,0 +1,128 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+from moviepy.config import get_setting
+
+from media_info import probe
+
+BACKENDS = ["moviepy", "ffmpeg"]
+
+
+def probe_video(path):
+    """Return (width, height, duration, has_audio) without starting a decoder."""
+    info = probe(path)
+    return int(info["width"]), int(info["height"]), info["duration"], info["has_audio"]
+
+
+def make_layer(image, start, end, fade_in=0.0, fade_out=0.0, position=(0, 0)):
+    return {
+        "image": image,
+        "start": start,
+        "end": end,
+        "fade_in": fade_in,
+        "fade_out": fade_out,
+        "position": position,
+    }
+
+
+def output_frames(duration, layers, fps=24):
+    """Return how many frames the MoviePy backend writes for this output.
+
+    write_videofile renders t = 0, 1/fps, ... below the output's duration,
+    which runs to the later of the source's end and the last layer's end.
+    """
+    return len(np.arange(0, max([duration] + [layer["end"] for layer in layers]), 1.0 / fps))
+
+
+def build_filter_graph(layers, fps=24, size=None):
+    """Chain one overlay per layer onto the source video.
+
+    Each layer is an RGBA sprite repeated as its own input and overlaid at its
+    position, so only the sprite's region is blended. It is shown
+    for start <= t < end (a SpriteLayer's window) and faded on its alpha
+    channel with the same linear ramps as compositor.fade_ramp. Blending
+    happens in RGB like the MoviePy backend's compositor before the final
+    yuv420p convert.
+    With size, the source is first scaled to (width, height) for drafts.
+
+    Output frame k shows source frame floor(k * source_fps / fps), the one
+    MoviePy's reader picks, and black once the source has ended, like
+    CompositeVideoClip's background; the caller caps the frame count.
+    """
+    scale = f",scale={size[0]}:{size[1]}:flags=bicubic" if size else ""
+    # fps keeps the last source frame rounded into each output slot, so round=up
+    # (not down) is what leaves slot k with frame floor(k * source_fps / fps).
+    parts = [f"[0:v]fps={fps}:round=up,tpad=stop=-1:color=black{scale}[base0]"]
+    for n, layer in enumerate(layers, start=1):
+        # Decode the PNG once and repeat that frame instead of re-reading it per frame.
+        # Microsecond timestamps keep fade from snapping st and d to whole frames.
+        chain = f"[{n}:v]format=rgba,loop=loop=-1:size=1:start=0,settb=AVTB,setpts=N/{fps}/TB"
+        if layer["fade_in"]:
+            chain += f",fade=t=in:st={layer['start']:.6f}:d={layer['fade_in']:.6f}:alpha=1"
+        if layer["fade_out"]:
+            fade_st = layer["end"] - layer["fade_out"]
+            chain += f",fade=t=out:st={fade_st:.6f}:d={layer['fade_out']:.6f}:alpha=1"
+        parts.append(f"{chain}[ov{n}]")
+        # Full precision: an end like 3.0000000000000004 still covers the frame at t=3.
+        enable = f"gte(t,{layer['start']:.17g})*lt(t,{layer['end']:.17g})"
+        x, y = layer["position"]
+        parts.append(
+            f"[base{n - 1}][ov{n}]overlay=x={x}:y={y}:format=rgb:shortest=1:enable='{enable}'[base{n}]"
+        )
+    parts.append(f"[base{len(layers)}]format=yuv420p[vout]")
+    return ";".join(parts)
+
+
+def render_static_overlays(
+    video_path,
+    output_path,
+    layers,
+    duration,
+    fps=24,
+    has_audio=True,
+    temp_dir=None,
+    size=None,
+):
+    """Render fixed RGBA sprites onto a video in a single ffmpeg pass; return the frame count.
+
+    The output has the same frames as the MoviePy backend's (see
+    output_frames). Encoder settings mirror the MoviePy `write_videofile`
+    call used by `render_video` (libx264 ultrafast, yuv420p, AAC 44.1 kHz
+    stereo).
+    """
+    frames = output_frames(duration, layers, fps)
+    work_dir = tempfile.mkdtemp(prefix="ffgraph_", dir=temp_dir)
+    try:
+        cmd = [get_setting("FFMPEG_BINARY"), "-y", "-v", "error", "-i", video_path]
+        for n, layer in enumerate(layers, start=1):
+            png_path = os.path.join(work_dir, f"layer_{n}.png")
+            layer["image"].save(png_path)
+            cmd += ["-framerate", str(fps), "-i", png_path]
+
+        cmd += ["-filter_complex", build_filter_graph(layers, fps, size), "-map", "[vout]"]
+        if has_audio:
+            cmd += ["-map", "0:a:0", "-c:a", "aac", "-ar", "44100", "-ac", "2"]
+        cmd += [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-pix_fmt",
+            "yuv420p",
+            "-r",
+            str(fps),
+            "-frames:v",
+            str(frames),
+            output_path,
+        ]
+
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            err = proc.stderr.decode(errors="replace").strip().splitlines()
+            raise RuntimeError(f"ffmpeg failed: {err[-1] if err else proc.returncode}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return frames
@@ -0,0 +1,79 @@
+import functools
+import hashlib
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+
+FONT_CACHE_SIZE = 256
+
+_MEASURE = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_truetype(font_path, mtime_ns, file_size, size):
+    return ImageFont.truetype(font_path, size)
+
+
+def load_font(font_path, size):
+    """Return a process-wide cached FreeTypeFont for (font_path, size).
+
+    The file's mtime and length are part of the key, so a font replaced on disk
+    (the app rewrites custom_font.ttf on every upload) is parsed again.
+    """
+    st = os.stat(font_path)
+    return _load_truetype(font_path, st.st_mtime_ns, st.st_size, int(size))
+
+
+@functools.lru_cache(maxsize=32)
+def _file_digest(font_path, mtime_ns, file_size):
+    h = hashlib.sha256()
+    with open(font_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def font_digest(font_path):
+    """Return the sha256 of a font file's contents, hashed once per (path, mtime, size)."""
+    st = os.stat(font_path)
+    return _file_digest(font_path, st.st_mtime_ns, st.st_size)
+
+
+def text_fits(text, font, target_width, target_height, stroke_w=0, spacing=-12):
+    bbox = _MEASURE.textbbox(
+        (0, 0),
+        text,
+        font=font,
+        spacing=spacing,
+        stroke_width=stroke_w,
+        align="center",
+    )
+    return (bbox[2] - bbox[0]) <= target_width and (bbox[3] - bbox[1]) <= target_height
+
+
+def get_scaled_font(text, font_path, max_size, target_width, target_height, stroke_w=0, spacing=-12):
+    """Return (font, size) for the largest size on the ladder max_size, max_size - 2, ... (> 20) that fits.
+
+    Text extent grows with point size, so the ladder is binary searched instead
+    of walked; the result is the same size the step-by-2 scan picks. Falls back
+    to max_size when nothing fits, and to PIL's default font without a path.
+    """
+    size = max_size
+    try:
+        font = load_font(font_path, size) if font_path else ImageFont.load_default()
+    except Exception:
+        return ImageFont.load_default(), size
+    if not font_path:
+        return font, size
+
+    ladder = range(int(max_size), 20, -2)
+    lo, hi = 0, len(ladder)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if text_fits(text, load_font(font_path, ladder[mid]), target_width, target_height, stroke_w, spacing):
+            hi = mid
+        else:
+            lo = mid + 1
+    if lo == len(ladder):
+        return font, size
+    return load_font(font_path, ladder[lo]), ladder[lo]
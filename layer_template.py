@@ -0,0 +1,276 @@
+import json
+import os
+import string
+import sys
+
+from motion import ANIMATED_PROFILES
+
+# The layout every render used before templates existed. A template is a
+# JSON (or YAML) object of this shape:
+#
+#   fields  name -> {"columns": [CSV column candidates], "default": value},
+#           or just the list of columns
+#   layers  in drawing order, each with
+#     text      str.format text; {name} is a field ({{ and }} for braces)
+#     upper     uppercase the formatted text (default false)
+#     size      "title" or "body" (the batch's title/body size) or points
+#     start, duration   fractions of the source video's duration
+#     fade_in, fade_out seconds; applied when the layer is drawn still
+#     motion    a motion profile name, or omitted for the batch's profile
+#     color, stroke_color, stroke_width, shadow, offset  per-layer style
+#               overrides of the batch's (hex colors, offset [x, y])
+DEFAULT_TEMPLATE = {
+    "fields": {
+        "city": {"columns": ["City", "Location", "city"], "default": "Unknown"},
+        "date": {"columns": ["Date"], "default": ""},
+        "venue": {"columns": ["Venue"], "default": ""},
+        "ticket": {"columns": ["Ticket_Link"], "default": ""},
+    },
+    "layers": [
+        {
+            "name": "Intro",
+            "text": "LAWRENCE\nWITH JACOB JEFFRIES",
+            "size": "title",
+            "start": 0.0,
+            "duration": 0.25,
+            "fade_out": 0.2,
+            "motion": "Static",
+        },
+        {
+            "name": "Middle",
+            "text": "{date}\n{city}\n{venue}",
+            "upper": True,
+            "size": "body",
+            "start": 0.25,
+            "duration": 0.55,
+            "fade_in": 0.2,
+        },
+        {
+            "name": "Outro",
+            "text": "TICKETS ON SALE NOW\n{ticket}",
+            "upper": True,
+            "size": "body",
+            "start": 0.80,
+            "duration": 0.20,
+        },
+    ],
+}
+
+MOTIONS = ("Static",) + tuple(sorted(ANIMATED_PROFILES))
+SIZE_NAMES = ("title", "body")
+_LAYER_KEYS = {
+    "name",
+    "text",
+    "upper",
+    "size",
+    "start",
+    "duration",
+    "fade_in",
+    "fade_out",
+    "motion",
+    "color",
+    "stroke_color",
+    "stroke_width",
+    "shadow",
+    "offset",
+}
+
+# Row-independent layers kept per compiled template (one entry per frame
+# size, duration and style), so long-lived farm workers stay bounded.
+STATIC_CACHE_SIZE = 64
+
+
+def _hex_to_rgb(h):
+    h = h.lstrip("#")
+    return tuple(int(h[i : i + 2], 16) for i in (0, 2, 4))
+
+
+class TemplateLayer:
+    """One layer of a compiled template; see DEFAULT_TEMPLATE for the keys."""
+
+    def __init__(self, spec, n, field_names):
+        where = f"layer {n + 1}"
+        if not isinstance(spec, dict):
+            raise ValueError(f"{where}: expected an object")
+        unknown = set(spec) - _LAYER_KEYS
+        if unknown:
+            raise ValueError(f"{where}: unknown key(s) {', '.join(sorted(unknown))}")
+        self.name = str(spec.get("name") or f"Layer {n + 1}")
+        where = f"layer {self.name!r}"
+        self.text = spec.get("text")
+        if not isinstance(self.text, str) or not self.text:
+            raise ValueError(f"{where}: text is required")
+        try:
+            parsed = list(string.Formatter().parse(self.text))
+        except ValueError as e:
+            raise ValueError(f"{where}: bad text: {e}") from None
+        self.fields = tuple(dict.fromkeys(name for _lit, name, _spec, _conv in parsed if name is not None))
+        for name in self.fields:
+            if name not in field_names:
+                raise ValueError(f"{where}: text uses {{{name}}}, which is not in fields")
+        self.upper = bool(spec.get("upper", False))
+        self.size = spec.get("size", "body")
+        if isinstance(self.size, (int, float)) and not isinstance(self.size, bool) and self.size > 0:
+            self.size = int(self.size)
+        elif self.size not in SIZE_NAMES:
+            raise ValueError(f"{where}: size must be {' or '.join(SIZE_NAMES)} or a positive number")
+        try:
+            self.start = float(spec.get("start", 0.0))
+            self.duration = float(spec.get("duration", 1.0 - self.start))
+            self.fade_in = float(spec.get("fade_in", 0.0))
+            self.fade_out = float(spec.get("fade_out", 0.0))
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}: start, duration, fade_in and fade_out must be numbers") from None
+        if not (0.0 <= self.start < 1.0 and 0.0 < self.duration and self.start + self.duration <= 1.0 + 1e-9):
+            raise ValueError(f"{where}: start and duration must lie within 0..1 of the video")
+        if self.fade_in < 0 or self.fade_out < 0:
+            raise ValueError(f"{where}: fades cannot be negative")
+        self.motion = spec.get("motion")
+        if self.motion is not None and self.motion not in MOTIONS:
+            raise ValueError(f"{where}: motion must be one of {', '.join(MOTIONS)}")
+        try:
+            self.overrides = {
+                key: value
+                for key, value in (
+                    ("text_rgb", _hex_to_rgb(spec["color"]) if "color" in spec else None),
+                    ("stroke_rgb", _hex_to_rgb(spec["stroke_color"]) if "stroke_color" in spec else None),
+                    ("stroke_w", int(spec["stroke_width"]) if "stroke_width" in spec else None),
+                    ("shadow_off", int(spec["shadow"]) if "shadow" in spec else None),
+                    ("pos_x", int(spec["offset"][0]) if "offset" in spec else None),
+                    ("pos_y", int(spec["offset"][1]) if "offset" in spec else None),
+                )
+                if value is not None
+            }
+        except (TypeError, ValueError, IndexError, AttributeError):
+            raise ValueError(f"{where}: bad style override (colors are hex, offset is [x, y])") from None
+
+    def format(self, values):
+        text = self.text.format(**values)
+        return text.upper() if self.upper else text
+
+    def window(self, dur):
+        """Return (start, duration) in seconds for a source of length dur."""
+        return dur * self.start, dur * self.duration
+
+
+class LayerTemplate:
+    """A validated layer template, with the row-independent work done once.
+
+    Layers whose text uses no fields are the same on every row; their
+    finished overlay layers are kept in static_layer(), keyed by everything
+    else they depend on (frame size, duration, style), so a batch builds them
+    once per source geometry instead of once per row.
+    """
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise ValueError("a template is a JSON/YAML object with fields and layers")
+        fields = spec.get("fields", {})
+        if not isinstance(fields, dict):
+            raise ValueError("fields must map names to {columns, default}")
+        self.fields = {}
+        for name, field in fields.items():
+            if isinstance(field, (list, str)):
+                field = {"columns": field}
+            columns = field.get("columns", [name]) if isinstance(field, dict) else None
+            if isinstance(columns, str):
+                columns = [columns]
+            if not columns or not all(isinstance(c, str) for c in columns):
+                raise ValueError(f"field {name!r}: columns must be a list of CSV column names")
+            self.fields[name] = (tuple(columns), str(field.get("default", "")))
+        layers = spec.get("layers")
+        if not isinstance(layers, list) or not layers:
+            raise ValueError("layers must be a non-empty list")
+        self.layers = [TemplateLayer(layer, n, self.fields) for n, layer in enumerate(layers)]
+        self._static = {}
+
+    def columns(self, df_columns, col_map=None):
+        """Return {field: CSV column or None}: col_map's choice if it maps the field, else the first candidate present."""
+        col_map = col_map or {}
+        resolved = {}
+        for name, (columns, _default) in self.fields.items():
+            if name in col_map:
+                resolved[name] = col_map[name]
+            else:
+                resolved[name] = next((c for c in columns if c in df_columns), None)
+        return resolved
+
+    def values(self, row, col_map):
+        """Return {field: str value} for a row; fields col_map does not cover read their first candidate column."""
+        values = {}
+        for name, (columns, default) in self.fields.items():
+            column = col_map[name] if name in col_map else columns[0]
+            values[name] = str(row.get(column, default))
+        return values
+
+    def texts(self, row, col_map):
+        """Return every layer's text for a row, in layer order."""
+        values = self.values(row, col_map)
+        return tuple(layer.format(values) for layer in self.layers)
+
+    def motions(self, motion_profile):
+        """Return every layer's motion profile, filling in the batch's where a layer names none."""
+        return [layer.motion or motion_profile for layer in self.layers]
+
+    def animated(self, motion_profile):
+        return any(motion in ANIMATED_PROFILES for motion in self.motions(motion_profile))
+
+    def static_layer(self, key, build):
+        """Return build()'s result for a field-free layer, reusing it for the same key."""
+        if key not in self._static:
+            if len(self._static) >= STATIC_CACHE_SIZE:
+                self._static.pop(next(iter(self._static)))
+            self._static[key] = build()
+        return self._static[key]
+
+
+_compiled = {}
+
+
+def compile_template(spec=None):
+    """Return the LayerTemplate for spec (DEFAULT_TEMPLATE when None), compiled once per process."""
+    spec = DEFAULT_TEMPLATE if spec is None else spec
+    key = json.dumps(spec, sort_keys=True)
+    template = _compiled.get(key)
+    if template is None:
+        template = _compiled[key] = LayerTemplate(spec)
+    return template
+
+
+def parse_template(text, name="template.json"):
+    """Parse template text (YAML when name ends in .yaml/.yml, else JSON) and validate it; returns the spec."""
+    if os.path.splitext(name)[1].lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML templates need PyYAML (pip install pyyaml); JSON works without it") from None
+        try:
+            spec = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"invalid YAML: {e}") from None
+    else:
+        try:
+            spec = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"invalid JSON: {e}") from None
+    compile_template(spec)
+    return spec
+
+
+def load_template(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_template(f.read(), path)
+
+
+if __name__ == "__main__":
+    # `python layer_template.py > my_template.json` writes the default to start from;
+    # `python layer_template.py my_template.yaml` checks a template.
+    if len(sys.argv) > 1:
+        try:
+            template = compile_template(load_template(sys.argv[1]))
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"{sys.argv[1]}: {e}")
+        for layer in template.layers:
+            print(f"{layer.name}: {layer.start:g}+{layer.duration:g}, fields {', '.join(layer.fields) or '-'}")
+    else:
+        print(json.dumps(DEFAULT_TEMPLATE, indent=2))
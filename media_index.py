@@ -0,0 +1,69 @@
+import os
+import threading
+
+_DIR_INDEXES = {}
+_DIR_LOCK = threading.Lock()
+
+
+class VideoIndex:
+    """Basename index over relative paths, built once per extraction.
+
+    Lookups try the relative path, then the exact basename, then the basename
+    case-insensitively, each in constant time. When several paths share a
+    basename the first one in sorted order wins (an exact-case match before
+    others); duplicates() reports those names so callers can warn.
+    """
+
+    def __init__(self, paths=()):
+        self._paths = set()
+        self._by_name = {}
+        self._by_folded = {}
+        for path in sorted(paths):
+            self.add(path)
+
+    def add(self, path):
+        name = os.path.basename(path)
+        self._paths.add(path)
+        self._by_name.setdefault(name, []).append(path)
+        self._by_folded.setdefault(name.casefold(), []).append(path)
+
+    def lookup(self, filename):
+        """Return the indexed path for filename, or None."""
+        filename = filename.replace("\\", "/")
+        if filename in self._paths:
+            return filename
+        name = os.path.basename(filename)
+        matches = self._by_name.get(name) or self._by_folded.get(name.casefold())
+        return matches[0] if matches else None
+
+    def duplicates(self):
+        """Return {casefolded basename: [paths]} for basenames that appear more than once, ignoring case."""
+        return {name: paths for name, paths in self._by_folded.items() if len(paths) > 1}
+
+
+def index_directory(root_dir):
+    """Walk root_dir once and return its VideoIndex; later calls reuse it."""
+    root_dir = os.path.abspath(root_dir)
+    with _DIR_LOCK:
+        index = _DIR_INDEXES.get(root_dir)
+        if index is None:
+            paths = []
+            for root, _dirs, files in os.walk(root_dir):
+                rel = os.path.relpath(root, root_dir)
+                for f in files:
+                    paths.append(f if rel == "." else os.path.join(rel, f).replace(os.sep, "/"))
+            index = _DIR_INDEXES[root_dir] = VideoIndex(paths)
+    return index
+
+
+def find_video_path(root_dir, filename):
+    """Resolve a CSV filename against an extraction directory or a ZipSource."""
+    if not isinstance(root_dir, str):
+        return root_dir.path_for(filename)
+    direct = os.path.join(root_dir, filename)
+    if os.path.exists(direct):
+        return direct
+    match = index_directory(root_dir).lookup(filename)
+    if match is None:
+        return os.path.join(root_dir, filename)
+    return os.path.join(root_dir, *match.split("/"))
@@ -0,0 +1,140 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+
+from moviepy.audio.io import readers as audio_readers
+from moviepy.video.io import ffmpeg_reader
+
+from atomic_file import atomic_write
+
+# Bump when the stored record changes shape, so old cache files are ignored.
+CACHE_VERSION = 1
+
+CACHE_DIRNAME = ".media_cache"
+
+_ffmpeg_parse_infos = ffmpeg_reader.ffmpeg_parse_infos
+
+
+def _backing_file(filename):
+    # A `subfile,,start,...,,:/path.zip` URL (see ZipSource) reads from the zip.
+    if filename.startswith("subfile,"):
+        return filename.split(",,:", 1)[1]
+    return filename
+
+
+class MediaInfoCache:
+    """Source metadata parsed once per version of each file.
+
+    Entries are the results of MoviePy's ffmpeg_parse_infos (one `ffmpeg -i`
+    run), keyed by the path and the size and mtime of the file behind it, so
+    an edited or replaced master is parsed again. Lookups hit memory first,
+    then JSON files under cache_dir when one is configured. Callers get a copy.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._items = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(filename, check_duration=True, fps_source="tbr"):
+        """Return the cache key for filename, or None if the file behind it cannot be read."""
+        try:
+            st = os.stat(_backing_file(filename))
+        except OSError:
+            return None
+        fields = {
+            "v": CACHE_VERSION,
+            "path": os.path.abspath(filename) if filename == _backing_file(filename) else filename,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "check_duration": check_duration,
+            "fps_source": fps_source,
+        }
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key, infos):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with atomic_write(path, suffix=".json") as f:
+                json.dump(infos, f)
+        except OSError:
+            pass
+
+    def parse_infos(self, filename, check_duration=True, fps_source="tbr"):
+        key = self.make_key(filename, check_duration, fps_source)
+        if key is None:
+            # Let ffmpeg report the missing file the way MoviePy always has.
+            return _ffmpeg_parse_infos(filename, False, check_duration, fps_source)
+        with self._lock:
+            infos = self._items.get(key)
+        if infos is None:
+            infos = self._load(key)
+            if infos is None:
+                infos = _ffmpeg_parse_infos(filename, False, check_duration, fps_source)
+                self._store(key, infos)
+            with self._lock:
+                self._items[key] = infos
+        return copy.deepcopy(infos)
+
+
+_cache = MediaInfoCache()
+
+
+def configure(cache_dir=None):
+    """Point the process-wide cache's disk tier at cache_dir (None disables it)."""
+    _cache.cache_dir = cache_dir
+
+
+def parse_infos(filename, print_infos=False, check_duration=True, fps_source="tbr"):
+    """Drop-in for MoviePy's ffmpeg_parse_infos that goes through the process-wide cache."""
+    if print_infos:
+        return _ffmpeg_parse_infos(filename, print_infos, check_duration, fps_source)
+    return _cache.parse_infos(filename, check_duration, fps_source)
+
+
+def install():
+    """Route MoviePy's video and audio readers through parse_infos.
+
+    VideoFileClip otherwise parses its source twice per open (once for the
+    frames, once for the audio), and again for every clip of the same master.
+    """
+    ffmpeg_reader.ffmpeg_parse_infos = parse_infos
+    audio_readers.ffmpeg_parse_infos = parse_infos
+
+
+def probe(path):
+    """Return the metadata of path without starting a decoder.
+
+    Keys: width, height (as stored, before rotation), duration, fps, nframes,
+    rotation, has_audio and audio_fps. Raises IOError if ffmpeg cannot read it.
+    """
+    infos = parse_infos(path)
+    width, height = infos.get("video_size") or (None, None)
+    return {
+        "width": width,
+        "height": height,
+        "duration": infos.get("duration"),
+        "fps": infos.get("video_fps"),
+        "nframes": infos.get("video_nframes"),
+        "rotation": infos.get("video_rotation", 0),
+        "has_audio": bool(infos.get("audio_found")),
+        "audio_fps": infos.get("audio_fps"),
+    }
@@ -0,0 +1,151 @@
+import os
+import resource
+import threading
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+MB = 1 << 20
+
+# Footprint model for one render task, fitted to the peak tree RSS (worker
+# plus its ffmpeg reader and x264 writer) of MoviePy renders from 720x1280 to
+# 2160x3840: a fixed cost for the interpreter and libraries, the decode side
+# shared by every output of a task, and per output the composite and encoder.
+# Overlay sprites add a little per layer. Measured peaks refine it at run time
+# (see MemoryGovernor.observe).
+BASE_BYTES = 200 * MB
+SHARED_BYTES_PER_PIXEL = 100
+OUTPUT_BYTES_PER_PIXEL = 50
+OVERLAY_BYTES_PER_PIXEL = 4
+
+# Share of the machine's (or container's) memory used when no budget is given.
+DEFAULT_BUDGET_SHARE = 0.8
+
+
+def _children(pid):
+    kids = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children", "r") as f:
+                kids.extend(int(k) for k in f.read().split())
+    except OSError:
+        pass
+    return kids
+
+
+def _rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def tree_rss(pid=None):
+    """Return the resident memory of pid and all its descendants (ffmpeg readers and writers), in bytes."""
+    pending = [pid or os.getpid()]
+    total = 0
+    while pending:
+        current = pending.pop()
+        total += _rss(current)
+        pending.extend(_children(current))
+    return total
+
+
+def estimate_footprint(width, height, overlays=3, outputs=1, scale=1.0):
+    """Return the projected peak memory in bytes of a task rendering outputs from one width x height source."""
+    pixels = width * height * scale * scale
+    per_pixel = SHARED_BYTES_PER_PIXEL + OUTPUT_BYTES_PER_PIXEL * outputs + OVERLAY_BYTES_PER_PIXEL * overlays
+    return int(BASE_BYTES + pixels * per_pixel)
+
+
+def total_memory():
+    """Return physical memory in bytes, capped by a cgroup v2 limit when running in a container."""
+    total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    try:
+        with open("/sys/fs/cgroup/memory.max", "r") as f:
+            limit = f.read().strip()
+    except OSError:
+        return total
+    return min(total, int(limit)) if limit.isdigit() else total
+
+
+def default_budget():
+    return int(total_memory() * DEFAULT_BUDGET_SHARE)
+
+
+class MemoryGovernor:
+    """Admission control for parallel renders under a memory budget in bytes.
+
+    Each task is admitted with its estimate_footprint(); fits() says whether it
+    can start now, i.e. whether the projections of the tasks in flight plus its
+    own stay within budget. A task is always admitted when nothing is running,
+    so one that alone exceeds the budget still renders, just by itself.
+
+    observe() compares a finished task's measured peak with its estimate and
+    keeps the largest ratio seen as a correction for later projections, so a
+    machine where renders run heavier than the model throttles itself after
+    the first results.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.correction = None
+        self._in_flight = {}
+
+    def project(self, estimate):
+        return int(estimate * (self.correction or 1.0))
+
+    def in_flight(self):
+        return sum(self._in_flight.values())
+
+    def fits(self, estimate):
+        return not self._in_flight or self.in_flight() + self.project(estimate) <= self.budget
+
+    def admit(self, key, estimate):
+        self._in_flight[key] = self.project(estimate)
+
+    def release(self, key):
+        self._in_flight.pop(key, None)
+
+    def observe(self, estimate, peak):
+        if estimate and peak:
+            ratio = peak / estimate
+            self.correction = ratio if self.correction is None else max(self.correction, ratio)
+
+
+class PeakRSS:
+    """Samples tree_rss() in the background while a render runs and keeps the peak.
+
+    Without /proc (not Linux) it falls back to this process's lifetime
+    ru_maxrss, which never goes down between renders.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._proc = os.path.exists(f"/proc/{os.getpid()}/statm")
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        self.peak = max(self.peak, tree_rss())
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        if self._proc:
+            self.sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join()
+            self.sample()
+        else:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return False
@@ -0,0 +1,133 @@
+import numpy as np
+from PIL import Image
+
+from compositor import SpriteLayer, fade_levels, frame_grid, premultiply
+
+EASINGS = {
+    "linear": lambda p: p,
+    "out_cubic": lambda p: 1 - (1 - p) ** 3,
+    "out_quart": lambda p: 1 - (1 - p) ** 4,
+    "in_out_sine": lambda p: 0.5 - 0.5 * np.cos(np.pi * p),
+}
+
+# Keyframes are (time, value, easing) where easing shapes the segment that
+# ends at that key. Times are seconds from the layer start, or "N%" of the
+# layer duration. dx/dy are fractions of the frame width/height, scale is
+# relative to the laid-out text, opacity multiplies the text's alpha.
+MOTION_PROFILES = {
+    "Cinematic Lift": {
+        "dy": [(0, 0.06, None), (0.8, 0.0, "out_cubic")],
+        "opacity": [(0, 0.0, None), (0.5, 1.0, "out_cubic")],
+    },
+    "Zoom Pop": {
+        "scale": [(0, 0.6, None), (0.25, 1.08, "out_cubic"), (0.4, 1.0, "in_out_sine")],
+        "opacity": [(0, 0.0, None), (0.15, 1.0, "linear")],
+    },
+    "Ghost Drift": {
+        "dx": [(0, -0.03, None), ("100%", 0.03, "linear")],
+        "opacity": [(0, 0.0, None), ("15%", 0.85, "out_cubic"), ("85%", 0.85, "linear"), ("100%", 0.0, "linear")],
+    },
+    "Shake": {
+        "shake": {"amplitude": 0.015, "frequency": 14.0, "decay": 0.35},
+    },
+}
+
+# Motion profiles that need per-frame positions, scales or opacity and
+# therefore cannot be expressed as fixed overlays; these always go through
+# MoviePy, whatever the backend.
+ANIMATED_PROFILES = {"Split Convergence"} | set(MOTION_PROFILES)
+
+# Zoom Pop and friends draw from pre-scaled copies of the sprite at this step
+# instead of resampling the text every frame.
+SCALE_STEP = 0.02
+
+
+def convergence_positions(start_x, final_x, y, start, duration, fps, slide=0.5):
+    """Per-frame integer (x, y) for a line sliding from start_x to final_x over `slide` seconds.
+
+    Positions are truncated the same way MoviePy's VideoClip.blit_on truncates them.
+    """
+    first, t = frame_grid(start, duration, fps)
+    progress = np.minimum(1.0, (t - start) / slide)
+    x = start_x + (final_x - start_x) * EASINGS["out_quart"](progress)
+    positions = np.empty((len(t), 2), dtype=np.int64)
+    positions[:, 0] = np.trunc(x)
+    positions[:, 1] = int(y)
+    return first, positions
+
+
+def _key_time(spec, duration):
+    if isinstance(spec, str) and spec.endswith("%"):
+        return duration * float(spec[:-1]) / 100.0
+    return min(float(spec), duration)
+
+
+def keyframe_track(keys, t, duration):
+    """Evaluate keyframes at the layer-relative times t (a NumPy array)."""
+    out = np.full(t.shape, float(keys[0][1]))
+    for (t0, v0, _e0), (t1, v1, easing) in zip(keys, keys[1:]):
+        t0, t1 = _key_time(t0, duration), _key_time(t1, duration)
+        if t1 > t0:
+            seg = (t >= t0) & (t < t1)
+            out[seg] = v0 + (v1 - v0) * EASINGS[easing or "linear"]((t[seg] - t0) / (t1 - t0))
+        out[t >= t1] = v1
+    return out
+
+
+def compile_motion(profile, start, duration, frame_size, fps):
+    """Compile a MOTION_PROFILES entry into per-frame arrays.
+
+    Returns (first_frame, dx, dy, scale, opacity) with dx/dy in pixels.
+    """
+    spec = MOTION_PROFILES[profile]
+    w, h = frame_size
+    first, t = frame_grid(start, duration, fps)
+    rel_t = t - start
+    ones = np.ones(t.shape)
+    dx = keyframe_track(spec["dx"], rel_t, duration) * w if "dx" in spec else 0 * ones
+    dy = keyframe_track(spec["dy"], rel_t, duration) * h if "dy" in spec else 0 * ones
+    scale = keyframe_track(spec["scale"], rel_t, duration) if "scale" in spec else ones
+    opacity = keyframe_track(spec["opacity"], rel_t, duration) if "opacity" in spec else ones
+    if "shake" in spec:
+        shake = spec["shake"]
+        amp = shake["amplitude"] * min(w, h) * np.exp(-rel_t / shake["decay"])
+        phase = 2 * np.pi * shake["frequency"] * rel_t
+        dx = dx + amp * np.sin(phase)
+        dy = dy + amp * np.cos(1.3 * phase)
+    return first, dx, dy, scale, np.clip(opacity, 0.0, 1.0)
+
+
+def keyframed_sprite(img, position, profile, start, duration, frame_size, fps=24):
+    """Animate a laid-out sprite (placed at position when at rest) with a MOTION_PROFILES entry."""
+    first, dx, dy, scale, opacity = compile_motion(profile, start, duration, frame_size, fps)
+    cx = position[0] + img.width / 2
+    cy = position[1] + img.height / 2
+
+    levels = np.round(scale / SCALE_STEP) * SCALE_STEP
+    variants = variant_index = None
+    sizes = np.empty((len(levels), 2))
+    if np.any(np.abs(levels - 1.0) > 1e-9):
+        unique, variant_index = np.unique(np.round(levels, 6), return_inverse=True)
+        variants = []
+        for n, level in enumerate(unique):
+            size = (max(1, int(round(img.width * level))), max(1, int(round(img.height * level))))
+            scaled = img if size == img.size else img.resize(size, Image.LANCZOS)
+            variants.append(premultiply(scaled))
+            sizes[variant_index == n] = size
+    else:
+        sizes[:] = img.size
+
+    positions = np.empty((len(levels), 2), dtype=np.int64)
+    positions[:, 0] = np.trunc(cx - sizes[:, 0] / 2 + dx)
+    positions[:, 1] = np.trunc(cy - sizes[:, 1] / 2 + dy)
+    return SpriteLayer(
+        img,
+        positions,
+        first,
+        fps,
+        start,
+        duration,
+        levels=fade_levels(opacity),
+        variants=variants,
+        variant_index=variant_index,
+    )
@@ -0,0 +1,138 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+
+from PIL import Image, PngImagePlugin
+
+from atomic_file import atomic_write
+from font_fit import font_digest
+
+# Bump when the rasterization code changes in a way that alters pixels, so
+# stale PNGs left in an output directory are never reused.
+CACHE_VERSION = 2
+
+CACHE_DIRNAME = ".overlay_cache"
+
+
+def crop_to_sprite(img):
+    """Crop an RGBA canvas to its non-transparent pixels.
+
+    Returns (sprite, (x, y)) where (x, y) places the sprite back on the canvas.
+    Everything outside the box has zero alpha, so blending the sprite at that
+    offset gives the same frame as blending the full canvas.
+    """
+    box = img.getchannel("A").getbbox()
+    if box is None:
+        return Image.new("RGBA", (1, 1)), (0, 0)
+    return img.crop(box), (box[0], box[1])
+
+
+class OverlayCache:
+    """Content-addressed cache of rendered RGBA sprites.
+
+    Entries are (sprite, (x, y)) pairs keyed by a hash of everything that
+    affects the pixels (text, font file contents, size, colors, stroke, shadow,
+    offsets, canvas size). Lookups hit an in-memory LRU bounded by max_bytes
+    first, then PNGs under cache_dir when one is configured; the placement
+    offset is stored in the PNG's text chunk. Returned sprites are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._items = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(fields):
+        payload = json.dumps({"v": CACHE_VERSION, **fields}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    @staticmethod
+    def _nbytes(entry):
+        img = entry[0]
+        return img.width * img.height * len(img.getbands())
+
+    def _remember(self, key, entry):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return
+            self._items[key] = entry
+            self._bytes += self._nbytes(entry)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _old_key, old = self._items.popitem(last=False)
+                self._bytes -= self._nbytes(old)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+                return entry
+        if self.cache_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    with Image.open(path) as f:
+                        x, y = (int(v) for v in f.text.get("offset", "0,0").split(","))
+                        entry = (f.convert("RGBA"), (x, y))
+                except (OSError, ValueError):
+                    return None
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        img, (x, y) = entry
+        info = PngImagePlugin.PngInfo()
+        info.add_text("offset", f"{x},{y}")
+        # Write then rename so parallel workers never read a partial PNG.
+        try:
+            with atomic_write(path, "wb", suffix=".png") as f:
+                img.save(f, format="PNG", compress_level=1, pnginfo=info)
+        except OSError:
+            pass
+
+    def get_or_render(self, fields, render):
+        """Return the cached (sprite, offset) for fields, calling render() on a miss."""
+        key = self.make_key(fields)
+        entry = self.get(key)
+        if entry is None:
+            entry = render()
+            self.put(key, entry)
+        return entry
+
+
+_cache = OverlayCache()
+
+
+def configure(cache_dir=None, max_bytes=None):
+    """Point the process-wide cache's disk tier at cache_dir (None disables it)."""
+    _cache.cache_dir = cache_dir
+    if max_bytes is not None:
+        _cache.max_bytes = max_bytes
+
+
+def cached_overlay(fields, render, font_path=None):
+    """Return render()'s (sprite, offset) through the process-wide cache, keyed by fields plus the font's content hash."""
+    try:
+        digest = font_digest(font_path) if font_path else None
+    except OSError:
+        # get_scaled_font falls back to PIL's default font for unreadable paths.
+        digest = None
+    return _cache.get_or_render({**fields, "font": digest}, render)
@@ -0,0 +1,116 @@
+import collections
+import threading
+
+import numpy as np
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from PIL import Image
+
+# Scrub slider positions in the live editor: 0.0 .. 5.0 s every 0.1 s.
+SLIDER_TIMES = [round(k * 0.1, 1) for k in range(51)]
+
+
+class FrameCache:
+    """Byte-bounded LRU of decoded preview frames, keyed by (path, size, t).
+
+    Streamlit runs every session as a thread of one process, so the single
+    process-wide instance below bounds the frames of all sessions and sources
+    together, however many readers are open. Returned images are shared and
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key, img):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return
+            self._items[key] = img
+            self._bytes += img.width * img.height * 3
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _old_key, old = self._items.popitem(last=False)
+                self._bytes -= old.width * old.height * 3
+
+
+_cache = FrameCache()
+
+
+class PreviewFrames:
+    """Long-lived frame source for the live editor's scrub slider.
+
+    One ffmpeg reader stays open per source and decodes straight to
+    preview_size (the fast preview's display resolution), so warm() walks
+    every slider position forward in that single process without holding
+    full-resolution frames, and builds a thumbnail strip. Frames live in the
+    process-wide FrameCache; ones evicted from it come back from the same
+    reader instead of a freshly spawned one. Full-resolution frames, for the
+    preview with fast mode off, come from a second reader opened on first use.
+    """
+
+    def __init__(self, path, preview_size=None, times=SLIDER_TIMES, thumb_every=0.5, thumb_height=64, cache=None):
+        self.path = path
+        self.times = list(times)
+        self.thumb_every = thumb_every
+        self.thumb_height = thumb_height
+        self.cache = cache or _cache
+        # target_resolution is (height, width).
+        self.reader = FFMPEG_VideoReader(path, target_resolution=preview_size[::-1] if preview_size else None)
+        self.size = tuple(self.reader.infos["video_size"])
+        self.preview_size = tuple(self.reader.size)
+        self.duration = self.reader.duration
+        self.strip = None
+        self._full_reader = None
+
+    def _clamp(self, t):
+        # Same guard the preview has always used against seeking past the end.
+        return round(min(t, self.duration - 0.1), 1) if self.duration else t
+
+    def _reader(self, full):
+        if not full or self.preview_size == self.size:
+            return self.reader
+        if self._full_reader is None:
+            self._full_reader = FFMPEG_VideoReader(self.path)
+        return self._full_reader
+
+    def warm(self):
+        """Decode every slider position at preview size in one forward pass and build the thumbnail strip."""
+        thumbs = []
+        for t in self.times:
+            img = self.frame(t)
+            if abs(t / self.thumb_every - round(t / self.thumb_every)) < 1e-6:
+                width = max(1, round(img.width * self.thumb_height / img.height))
+                thumbs.append(img.resize((width, self.thumb_height), Image.BILINEAR))
+        if thumbs:
+            self.strip = Image.new("RGB", (sum(t.width for t in thumbs), self.thumb_height))
+            x = 0
+            for thumb in thumbs:
+                self.strip.paste(thumb, (x, 0))
+                x += thumb.width
+        return self
+
+    def frame(self, t, full=False):
+        """Return the frame shown at slider time t as a PIL image, at preview size or, with full, the source's."""
+        size = self.size if full else self.preview_size
+        key = (self.path, size, self._clamp(t))
+        img = self.cache.get(key)
+        if img is None:
+            img = Image.fromarray(np.asarray(self._reader(full).get_frame(key[2])))
+            self.cache.put(key, img)
+        return img
+
+    def close(self):
+        # Cached frames stay: another session may show the same source.
+        self.reader.close()
+        if self._full_reader is not None:
+            self._full_reader.close()
@@ -0,0 +1,372 @@
+import json
+import os
+import pickle
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from atomic_file import atomic_write
+
+BATCH_NAME = "batch.pkl"
+CLOSED_NAME = "closed"
+CURRENT_NAME = "current"
+REPORT_NAME = "report.json"
+BATCHES_DIRNAME = "batches"
+LEASE_SEP = "@"
+
+
+def _dirs(batch_dir):
+    return {name: os.path.join(batch_dir, name) for name in ("pending", "leases", "results", "outputs", "workers")}
+
+
+def current_batch(farm_dir):
+    """Return the directory of the batch most recently published to farm_dir, or None."""
+    try:
+        with open(os.path.join(farm_dir, CURRENT_NAME), "r", encoding="utf-8") as f:
+            batch_id = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(farm_dir, BATCHES_DIRNAME, batch_id) if batch_id else None
+
+
+def _write_atomic(path, data, binary=False):
+    with atomic_write(path, "wb" if binary else "w") as f:
+        if binary:
+            pickle.dump(data, f)
+        else:
+            json.dump(data, f, default=str)
+
+
+def publish(farm_dir, tasks, zip_path, render_args):
+    """Lay out a new batch for tasks in farm_dir; return (batch_dir, {task_id: task}).
+
+    Every batch gets its own directory under farm_dir/batches, so queues,
+    results and outputs of earlier batches on the same share never mix with
+    it; farm_dir/current names the batch workers should join and is switched
+    only once the batch is complete. Inputs are linked (or copied) into
+    batch_dir/inputs and every path is stored relative to batch_dir, so hosts
+    may mount the share anywhere. Each task becomes one pending job file;
+    workers write outputs under batch_dir/outputs using the job's output file
+    names. The overlay and metadata caches stay at farm_dir level, shared by
+    all batches, as their entries are keyed by content.
+    """
+    from render_manifest import link_output
+
+    batch_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    batch_dir = os.path.join(farm_dir, BATCHES_DIRNAME, batch_id)
+    dirs = _dirs(batch_dir)
+    for path in dirs.values():
+        os.makedirs(path)
+    inputs = os.path.join(batch_dir, "inputs")
+    os.makedirs(inputs)
+    link_output(zip_path, os.path.join(inputs, "videos.zip"))
+    font = None
+    if render_args.get("font_path") and os.path.exists(render_args["font_path"]):
+        font = os.path.join("inputs", os.path.basename(render_args["font_path"]))
+        link_output(render_args["font_path"], os.path.join(batch_dir, font))
+    _write_atomic(
+        os.path.join(batch_dir, BATCH_NAME),
+        {
+            "zip": os.path.join("inputs", "videos.zip"),
+            "font": font,
+            "style": render_args["style"],
+            "overlay_cache": render_args.get("cache_dir") is not None,
+            "profile": render_args.get("profile_dir") is not None,
+        },
+        binary=True,
+    )
+    published = {}
+    for n, task in enumerate(tasks):
+        task_id = f"{n:06d}"
+        jobs = [(i, c_name, os.path.basename(out_path), r) for i, c_name, out_path, r in task]
+        _write_atomic(os.path.join(dirs["pending"], task_id), {"id": task_id, "jobs": jobs}, binary=True)
+        published[task_id] = task
+    with atomic_write(os.path.join(farm_dir, CURRENT_NAME)) as f:
+        f.write(batch_id)
+    return batch_dir, published
+
+
+def claim(batch_dir, worker_id):
+    """Take the first pending job by renaming it into leases/; return (task_id, lease_path) or None.
+
+    rename is atomic on one filesystem, so exactly one worker wins each job.
+    """
+    dirs = _dirs(batch_dir)
+    for task_id in sorted(os.listdir(dirs["pending"])):
+        if task_id.startswith("."):
+            continue
+        lease_path = os.path.join(dirs["leases"], f"{task_id}{LEASE_SEP}{worker_id}")
+        try:
+            os.rename(os.path.join(dirs["pending"], task_id), lease_path)
+        except FileNotFoundError:
+            continue
+        os.utime(lease_path)
+        return task_id, lease_path
+    return None
+
+
+class Heartbeat(threading.Thread):
+    """Touches the current lease and rewrites workers/<worker_id>.json every interval seconds."""
+
+    def __init__(self, batch_dir, worker_id, interval):
+        super().__init__(daemon=True)
+        self.path = os.path.join(_dirs(batch_dir)["workers"], f"{worker_id}.json")
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lease_path = None
+        self.task_id = None
+        self.done = 0
+        self._stop_event = threading.Event()
+
+    def beat(self):
+        if self.lease_path:
+            try:
+                os.utime(self.lease_path)
+            except OSError:
+                # The coordinator re-queued the job; the render finishes anyway.
+                pass
+        status = {
+            "worker": self.worker_id,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "task": self.task_id,
+            "done": self.done,
+            "beat": time.time(),
+        }
+        try:
+            _write_atomic(self.path, status)
+        except OSError:
+            pass
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.beat()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def worker(farm_dir, worker_id=None, poll=1.0, heartbeat=5.0, scratch_dir=None):
+    """Claim and render jobs from farm_dir's current batch until the coordinator closes it; return the number rendered.
+
+    A worker started while no batch is open (none published yet, or the last
+    one closed) waits for the next.
+    """
+    import batch_render
+    from zip_source import ZipSource
+
+    farm_dir = os.path.abspath(farm_dir)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+    batch_dir = current_batch(farm_dir)
+    while batch_dir is None or os.path.exists(os.path.join(batch_dir, CLOSED_NAME)):
+        time.sleep(poll)
+        batch_dir = current_batch(farm_dir)
+    dirs = _dirs(batch_dir)
+    with open(os.path.join(batch_dir, BATCH_NAME), "rb") as f:
+        batch = pickle.load(f)
+
+    scratch = tempfile.mkdtemp(prefix="farm_worker_", dir=scratch_dir)
+    parts_dir = os.path.join(dirs["outputs"], ".parts", worker_id)
+    os.makedirs(parts_dir, exist_ok=True)
+    render_args = {
+        "font_path": os.path.join(batch_dir, batch["font"]) if batch["font"] else None,
+        "cache_dir": os.path.join(farm_dir, batch_render.CACHE_DIRNAME) if batch["overlay_cache"] else None,
+        "media_cache_dir": os.path.join(farm_dir, batch_render.media_info.CACHE_DIRNAME),
+        "profile_dir": os.path.join(batch_dir, batch_render.PROFILE_DIRNAME) if batch["profile"] else None,
+        "style": batch["style"],
+    }
+    if render_args["profile_dir"]:
+        os.makedirs(render_args["profile_dir"], exist_ok=True)
+    batch_render._init_worker(scratch, render_args["cache_dir"], render_args["media_cache_dir"])
+    videos_dir = ZipSource(os.path.join(batch_dir, batch["zip"]), os.path.join(scratch, "videos"))
+
+    beat = Heartbeat(batch_dir, worker_id, heartbeat)
+    beat.beat()
+    beat.start()
+    try:
+        while True:
+            claimed = claim(batch_dir, worker_id)
+            if claimed is None:
+                if os.path.exists(os.path.join(batch_dir, CLOSED_NAME)):
+                    return beat.done
+                time.sleep(poll)
+                continue
+            task_id, lease_path = claimed
+            beat.task_id, beat.lease_path = task_id, lease_path
+            with open(lease_path, "rb") as f:
+                job = pickle.load(f)
+            task = [(i, c_name, os.path.join(parts_dir, name), r) for i, c_name, name, r in job["jobs"]]
+            started = time.time()
+            try:
+                results = batch_render._render_task(task, videos_dir, render_args)
+            except Exception as e:
+                results = [(i, c_name, False, str(e), None) for i, c_name, _path, _r in task]
+            for (i, c_name, success, msg, record), (_i, _c, part_path, _r) in zip(results, task):
+                if success:
+                    os.replace(part_path, os.path.join(dirs["outputs"], os.path.basename(part_path)))
+                elif os.path.exists(part_path):
+                    os.remove(part_path)
+            _write_atomic(
+                os.path.join(dirs["results"], task_id),
+                {
+                    "id": task_id,
+                    "worker": worker_id,
+                    "host": socket.gethostname(),
+                    "started": started,
+                    "finished": time.time(),
+                    "results": [list(result) for result in results],
+                },
+            )
+            beat.task_id, beat.lease_path = None, None
+            beat.done += 1
+            try:
+                os.remove(lease_path)
+            except FileNotFoundError:
+                pass
+    finally:
+        beat.stop()
+        beat.task_id = None
+        beat.beat()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def start_local_workers(farm_dir, count, log_dir=None, **options):
+    """Start count worker processes on this host (for one-box farms and testing); logs go to log_dir (default farm_dir)."""
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_render.py"), "worker"]
+    cmd += ["--farm", farm_dir]
+    for name, value in options.items():
+        cmd += [f"--{name.replace('_', '-')}", str(value)]
+    procs = []
+    for n in range(count):
+        log = open(os.path.join(log_dir or farm_dir, f"local_worker_{n}.log"), "ab")
+        procs.append(subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT))
+        log.close()
+    return procs
+
+
+def collect(batch_dir, published, lease_timeout=60.0, max_attempts=3, poll=1.0):
+    """Yield (index, city, success, msg, stats record or None, output path or None) as results land.
+
+    A lease is expired when its file's mtime has not changed for
+    lease_timeout seconds by this machine's clock (so host clocks need not
+    agree); the job goes back to pending/ for another worker, up to
+    max_attempts claims in all. Closes the farm once every job is accounted
+    for and writes report.json.
+    """
+    dirs = _dirs(batch_dir)
+    attempts = {task_id: 0 for task_id in published}
+    last_seen = {}
+    finished = set()
+    report = []
+    try:
+        while len(finished) < len(published):
+            for task_id in sorted(set(os.listdir(dirs["results"])) - finished):
+                if task_id not in published:
+                    continue
+                try:
+                    with open(os.path.join(dirs["results"], task_id), "r", encoding="utf-8") as f:
+                        result = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                finished.add(task_id)
+                for i, c_name, success, msg, record in result["results"]:
+                    path = os.path.join(dirs["outputs"], os.path.basename(_job_out_path(published[task_id], i)))
+                    report.append(
+                        {
+                            "index": i,
+                            "city": c_name,
+                            "ok": success,
+                            "msg": msg,
+                            "worker": result["worker"],
+                            "host": result["host"],
+                            "attempts": max(attempts[task_id], 1),
+                        }
+                    )
+                    yield i, c_name, success, msg, record, path if success else None
+
+            now = time.monotonic()
+            for lease in os.listdir(dirs["leases"]):
+                task_id, _sep, worker_id = lease.partition(LEASE_SEP)
+                lease_path = os.path.join(dirs["leases"], lease)
+                try:
+                    mtime = os.stat(lease_path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                seen = last_seen.get(lease)
+                if seen is None or seen[0] != mtime:
+                    if seen is None:
+                        attempts[task_id] = attempts.get(task_id, 0) + 1
+                    last_seen[lease] = (mtime, now)
+                    continue
+                if now - seen[1] < lease_timeout:
+                    continue
+                del last_seen[lease]
+                if task_id in finished or os.path.exists(os.path.join(dirs["results"], task_id)):
+                    _remove(lease_path)
+                elif attempts.get(task_id, 0) >= max_attempts:
+                    _remove(lease_path)
+                    task = published[task_id]
+                    msg = f"lease expired {attempts[task_id]} time(s); last worker {worker_id}"
+                    _write_atomic(
+                        os.path.join(dirs["results"], task_id),
+                        {
+                            "id": task_id,
+                            "worker": worker_id,
+                            "host": None,
+                            "results": [[i, c_name, False, msg, None] for i, c_name, _out_path, _r in task],
+                        },
+                    )
+                else:
+                    try:
+                        os.rename(lease_path, os.path.join(dirs["pending"], task_id))
+                    except FileNotFoundError:
+                        pass
+            if len(finished) < len(published):
+                time.sleep(poll)
+    finally:
+        open(os.path.join(batch_dir, CLOSED_NAME), "w").close()
+        _write_atomic(os.path.join(batch_dir, REPORT_NAME), {"jobs": sorted(report, key=lambda row: row["index"])})
+
+
+def _job_out_path(task, index):
+    return next(out_path for i, _c_name, out_path, _r in task if i == index)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def run_farm(farm_dir, tasks, zip_path, render_args, local_workers=0, lease_timeout=60.0, max_attempts=3, poll=1.0):
+    """Render tasks through a shared-directory farm; yields like batch_render.run_jobs.
+
+    Each finished output is moved from the farm to the job's own output path
+    before it is yielded; a job whose output cannot be moved (e.g. removed
+    from the share) is reported as failed.
+    """
+    farm_dir = os.path.abspath(farm_dir)
+    batch_dir, published = publish(farm_dir, tasks, zip_path, render_args)
+    heartbeat = max(1.0, lease_timeout / 4)
+    procs = start_local_workers(farm_dir, local_workers, log_dir=batch_dir, poll=poll, heartbeat=heartbeat)
+    try:
+        for i, c_name, success, msg, record, path in collect(batch_dir, published, lease_timeout, max_attempts, poll):
+            if success:
+                out_path = next(job[2] for task in published.values() for job in task if job[0] == i)
+                try:
+                    shutil.move(path, out_path)
+                except OSError as e:
+                    success, msg = False, f"output missing from farm: {e}"
+            yield i, c_name, success, msg, record
+    finally:
+        for proc in procs:
+            try:
+                proc.wait(timeout=max(30.0, lease_timeout))
+            except subprocess.TimeoutExpired:
+                proc.terminate()
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import shutil
+
+from atomic_file import atomic_write
+
+MANIFEST_NAME = ".render_manifest.json"
+
+# Bump when rendering changes in a way that alters output pixels or audio, so
+# every output from an older version is rendered again.
+MANIFEST_VERSION = 1
+
+
+def fingerprint(fields):
+    """Return the sha256 of everything that determines one output's bytes."""
+    payload = json.dumps({"v": MANIFEST_VERSION, **fields}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderManifest:
+    """Record of finished outputs in an output directory.
+
+    Each entry maps an output filename to the fingerprint of its inputs and
+    the size the file had when it was written. An output is up to date when
+    its fingerprint is unchanged and the file is still there at that size, so
+    a half-written file from a crashed run is never mistaken for a good one.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("outputs", {})
+        except (OSError, ValueError):
+            pass
+
+    def is_current(self, output_path, digest):
+        entry = self.entries.get(os.path.basename(output_path))
+        if not entry or entry["hash"] != digest:
+            return False
+        try:
+            return os.path.getsize(output_path) == entry["size"]
+        except OSError:
+            return False
+
+    def record(self, output_path, digest):
+        """Mark output_path as rendered from digest and persist the manifest."""
+        self.entries[os.path.basename(output_path)] = {"hash": digest, "size": os.path.getsize(output_path)}
+        self.save()
+
+    def forget(self, output_path):
+        if self.entries.pop(os.path.basename(output_path), None) is not None:
+            self.save()
+
+    def save(self):
+        with atomic_write(self.path, suffix=".json") as f:
+            json.dump({"version": MANIFEST_VERSION, "outputs": self.entries}, f, indent=1, sort_keys=True)
+
+
+def link_output(src, dst):
+    """Make dst the same file as src, hard-linked when the filesystem allows it."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -0,0 +1,164 @@
+import json
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+
+from atomic_file import atomic_write
+
+PROGRESS_NAME = "progress.json"
+SPEC_NAME = "spec.pkl"
+ASSETS_NAME = "Final_Assets.zip"
+CANCEL_NAME = "cancel"
+FINISHED_STATES = ("done", "cancelled", "failed")
+
+
+class Cancelled(BaseException):
+    # Not an Exception, so render_video's error handling cannot swallow it.
+    pass
+
+
+def _write_progress(job_dir, progress):
+    with atomic_write(os.path.join(job_dir, PROGRESS_NAME), suffix=".json") as f:
+        json.dump(progress, f)
+
+
+def submit(jobs_root, spec):
+    """Start a background worker for spec and return (job_id, job_dir).
+
+    The job directory holds the pickled spec, a progress.json the worker
+    rewrites after every output, and an optional `cancel` flag. The worker
+    leads its own process session, so Streamlit reruns and dropped browser
+    connections do not interrupt it. spec holds everything the worker needs: "outputs" (dicts with label,
+    row, out_path), "skipped" (log lines for outputs that were never
+    queued), "source_zip" and "videos_dir" (the uploaded zip on disk and the
+    directory its members are extracted to, on demand, as the worker renders),
+    "font_path", "cache_dir", "media_cache_dir" and "style" (the keyword
+    arguments of batch_render.render_video). Each finished output is
+    appended to the job's ASSETS_NAME archive, reported as "zip_path".
+    """
+    job_id = uuid.uuid4().hex[:12]
+    job_dir = os.path.join(jobs_root, job_id)
+    os.makedirs(job_dir)
+    with open(os.path.join(job_dir, SPEC_NAME), "wb") as f:
+        pickle.dump(spec, f)
+    _write_progress(
+        job_dir,
+        {"id": job_id, "state": "queued", "done": 0, "total": len(spec["outputs"]), "log": list(spec["skipped"])},
+    )
+    log = open(os.path.join(job_dir, "worker.log"), "ab")
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), job_dir],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+    log.close()
+    return job_id, job_dir
+
+
+def status(job_dir):
+    try:
+        with open(os.path.join(job_dir, PROGRESS_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cancel(job_dir):
+    """Ask the worker to stop; a render in progress is interrupted, not waited for."""
+    open(os.path.join(job_dir, CANCEL_NAME), "w").close()
+    progress = status(job_dir) or {}
+    pid = progress.get("pid")
+    if pid and progress.get("state") == "running":
+        try:
+            # The worker leads its own session, so this also stops its ffmpeg children.
+            os.killpg(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+
+def run(job_dir):
+    import pandas as pd
+
+    import batch_render
+    import media_info
+    import memory_governor
+    from overlay_cache import configure as configure_overlay_cache
+    from render_stats import STATS_NAME, RenderStats, append_records
+    from zip_source import ZipSource
+
+    with open(os.path.join(job_dir, SPEC_NAME), "rb") as f:
+        spec = pickle.load(f)
+    progress = status(job_dir)
+    progress.update(state="running", pid=os.getpid(), started=time.time())
+    _write_progress(job_dir, progress)
+
+    def on_term(_signum, _frame):
+        raise Cancelled()
+
+    signal.signal(signal.SIGTERM, on_term)
+    configure_overlay_cache(spec["cache_dir"])
+    media_info.configure(spec.get("media_cache_dir"))
+    videos = ZipSource(spec["source_zip"], spec["videos_dir"]) if spec.get("source_zip") else spec["videos_dir"]
+    scratch = tempfile.mkdtemp(prefix="scratch_", dir=job_dir)
+    zip_path = os.path.join(job_dir, ASSETS_NAME)
+    try:
+        for item in spec["outputs"]:
+            if os.path.exists(os.path.join(job_dir, CANCEL_NAME)):
+                raise Cancelled()
+            progress["current"] = item["label"]
+            _write_progress(job_dir, progress)
+            stats = RenderStats()
+            with memory_governor.PeakRSS() as peak:
+                success, msg = batch_render.render_video(
+                    pd.Series(item["row"]),
+                    videos,
+                    spec["font_path"],
+                    item["out_path"],
+                    temp_dir=scratch,
+                    stats=stats,
+                    **spec["style"],
+                )
+            record = stats.record(
+                output=os.path.basename(item["out_path"]),
+                ok=success,
+                peak_rss_mb=round(peak.peak / memory_governor.MB, 1),
+            )
+            progress.setdefault("stats", []).append(record)
+            append_records(os.path.join(os.path.dirname(item["out_path"]), STATS_NAME), [record])
+            if success:
+                # Appended while the MP4 is still in the page cache; stored, as H.264/AAC will not compress further.
+                # SIGTERM is held until the member and central directory are written, so a cancel
+                # lands between members and never leaves a truncated entry in the archive.
+                signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+                try:
+                    with zipfile.ZipFile(zip_path, "a", compression=zipfile.ZIP_STORED) as z:
+                        z.write(item["out_path"], os.path.basename(item["out_path"]))
+                    progress["zip_path"] = zip_path
+                finally:
+                    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+            progress["log"].append(f"{item['label']}: {'✅' if success else '❌ ' + msg}")
+            progress["done"] += 1
+            _write_progress(job_dir, progress)
+        progress["state"] = "done"
+    except Cancelled:
+        progress["state"] = "cancelled"
+    except Exception as e:
+        progress["state"] = "failed"
+        progress["log"].append(f"❌ {e}")
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        progress.pop("current", None)
+        progress["finished"] = time.time()
+        _write_progress(job_dir, progress)
+
+
+if __name__ == "__main__":
+    run(sys.argv[1])
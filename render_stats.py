@@ -0,0 +1,104 @@
+import contextlib
+import json
+import time
+
+STATS_NAME = ".render_stats.jsonl"
+PROFILE_DIRNAME = ".render_profiles"
+
+# Report order. A render fills only the stages its path goes through: the
+# ffmpeg backend does decode, composite and encode in one "ffmpeg" stage.
+STAGES = ("extract", "probe", "overlays", "audio", "decode", "composite", "encode", "ffmpeg")
+
+
+class RenderStats:
+    """Stage timers and a frame counter for one render.
+
+    stage() times a block; timed() wraps a callable that something else calls
+    (MoviePy's frame and audio callbacks), so work done inside
+    write_videofile can be attributed. Times are inclusive until exclude()
+    subtracts the nested stages.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = {}
+        self.frames = 0
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name, fn, count_frames=False):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+                if count_frames:
+                    self.frames += 1
+
+        return wrapper
+
+    def exclude(self, name, *nested):
+        """Turn name's inclusive time into its own time by removing nested stages."""
+        if name in self.seconds:
+            self.seconds[name] = max(0.0, self.seconds[name] - sum(self.seconds.get(n, 0.0) for n in nested))
+
+    def record(self, **fields):
+        """Return the JSON-ready record for this render, with fields (output, ok, ...) first."""
+        total = time.perf_counter() - self.started
+        return {
+            **fields,
+            "total_s": round(total, 4),
+            "frames": self.frames,
+            "fps": round(self.frames / total, 2) if total else None,
+            "stages": {name: round(self.seconds[name], 4) for name in STAGES if name in self.seconds},
+        }
+
+
+def append_records(path, records):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + "\n")
+
+
+def summarize(records):
+    """Return [(stage, seconds, share of total)] summed over records, ending with "other" and "total".
+
+    "other" is render time no stage accounts for (setup, closing files). With
+    parallel workers the total is summed across them, so it exceeds wall time.
+    """
+    totals = {}
+    for record in records:
+        for name, seconds in record["stages"].items():
+            totals[name] = totals.get(name, 0.0) + seconds
+    total = sum(record["total_s"] for record in records)
+    rows = [(name, totals[name]) for name in STAGES if name in totals]
+    other = total - sum(totals.values())
+    if other > 0.0005:
+        rows.append(("other", other))
+    rows.append(("total", total))
+    return [(name, round(seconds, 3), seconds / total if total else 0.0) for name, seconds in rows]
+
+
+def format_summary(records):
+    """Return the summary table as text lines for the CLI."""
+    frames = sum(record["frames"] for record in records)
+    lines = [f"{'Stage':<10} {'Time (s)':>10} {'Share':>7}"]
+    for name, seconds, share in summarize(records):
+        lines.append(f"{name:<10} {seconds:>10.2f} {share:>7.1%}")
+    total = sum(record["total_s"] for record in records)
+    if total:
+        lines.append(f"{len(records)} render(s), {frames} frames, {frames / total:.1f} frames/s")
+    peaks = [record["peak_rss_mb"] for record in records if record.get("peak_rss_mb")]
+    if peaks:
+        lines.append(f"Peak memory per render: {max(peaks):.0f} MB max, {sum(peaks) / len(peaks):.0f} MB mean")
+    return lines
@@ -1,10 +1,17 @@
 import argparse
+import json
 import os
 import subprocess
 import sys
+import time
 import zipfile
 from pathlib import Path
 
+from atomic_file import atomic_write
+
+INVENTORY_NAME = ".watch_inventory.json"
+WATCHED_EXTENSIONS = (".zip", ".csv", ".ttf")
+
 
 def find_latest(path, patterns):
     candidates = []
@@ -35,35 +42,70 @@ def find_latest_video_zip(path):
     return max(zips, key=lambda p: p.stat().st_mtime)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Find newest ZIP/CSV/TTF in a folder and run batch_render.py.")
-    parser.add_argument("--dir", default="~/Downloads", help="Directory to search (default: ~/Downloads)")
-    parser.add_argument("--output", default="output", help="Output directory")
-    parser.add_argument("--motion", default="Static", help="Motion profile (default: Static)")
-    parser.add_argument("--text-color", default="#FFFFFF", help="Text color hex (default: #FFFFFF)")
-    parser.add_argument("--stroke-color", default="#000000", help="Stroke color hex (default: #000000)")
-    parser.add_argument("--title-size", type=int, default=150, help="Title size (default: 150)")
-    parser.add_argument("--body-size", type=int, default=120, help="Body size (default: 120)")
-    parser.add_argument("--stroke-width", type=int, default=4, help="Stroke width (default: 4)")
-    parser.add_argument("--shadow", type=int, default=4, help="Shadow offset (default: 4)")
-    parser.add_argument("--offset-x", type=int, default=0, help="Horizontal offset (default: 0)")
-    parser.add_argument("--offset-y", type=int, default=0, help="Vertical offset (default: 0)")
-    args = parser.parse_args()
+class Inventory:
+    """Persisted record of the watched folder, keyed by (path, size, mtime).
 
-    search_dir = os.path.expanduser(args.dir)
-    if not os.path.isdir(search_dir):
-        raise SystemExit(f"Directory not found: {search_dir}")
+    Only files that are new or whose size or mtime changed since the last scan
+    are inspected, so a folder of large archives costs one stat per file per
+    poll. The (zip, csv) pair last rendered is stored alongside, so a restart
+    does not render the same inputs again.
+    """
 
-    zip_path = find_latest_video_zip(search_dir) or find_latest(search_dir, ["*.zip", "*.ZIP"])
-    csv_path = find_latest(search_dir, ["*.csv", "*.CSV"])
-    font_path = find_latest(search_dir, ["*.ttf", "*.TTF"])
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.last_pair = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.last_pair = data.get("last_pair")
+        except (OSError, ValueError):
+            pass
 
-    if not zip_path or not csv_path:
-        raise SystemExit("Could not find a ZIP and CSV in the search directory.")
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with atomic_write(self.path, suffix=".json") as f:
+            json.dump({"files": self.files, "last_pair": self.last_pair}, f, indent=1)
 
-    cmd = [
-        sys.executable,
-        "batch_render.py",
+    def scan(self, search_dir, settle=5.0):
+        """Refresh the inventory; files modified within `settle` seconds are left for the next scan."""
+        now = time.time()
+        files = {}
+        changed = False
+        for entry in os.scandir(search_dir):
+            if not entry.is_file() or not entry.name.lower().endswith(WATCHED_EXTENSIONS):
+                continue
+            st = entry.stat()
+            if now - st.st_mtime < settle:
+                continue
+            record = self.files.get(entry.path)
+            if record is None or record["size"] != st.st_size or record["mtime_ns"] != st.st_mtime_ns:
+                record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                if entry.name.lower().endswith(".zip"):
+                    record["has_video"] = zip_has_video(entry.path)
+                changed = True
+            files[entry.path] = record
+        changed = changed or files.keys() != self.files.keys()
+        self.files = files
+        if changed:
+            self.save()
+        return changed
+
+    def latest(self, extension, video_only=False):
+        candidates = [
+            (record["mtime_ns"], path)
+            for path, record in self.files.items()
+            if path.lower().endswith(extension) and (record.get("has_video") or not video_only)
+        ]
+        return max(candidates)[1] if candidates else None
+
+    def pair_key(self, zip_path, csv_path):
+        return [[p, self.files[p]["size"], self.files[p]["mtime_ns"]] for p in (zip_path, csv_path)]
+
+
+def render_argv(args, zip_path, csv_path, font_path):
+    argv = [
         "--zip",
         str(zip_path),
         "--csv",
@@ -88,9 +130,110 @@ def main():
         str(args.offset_x),
         "--offset-y",
         str(args.offset_y),
+        "--backend",
+        args.backend,
+        "--jobs",
+        str(args.jobs),
+        "--group-size",
+        str(args.group_size),
+        "--memory-budget",
+        str(args.memory_budget),
     ]
     if font_path:
-        cmd += ["--font", str(font_path)]
+        argv += ["--font", str(font_path)]
+    if args.template:
+        argv += ["--template", os.path.abspath(os.path.expanduser(args.template))]
+    if args.draft:
+        argv.append("--draft")
+    return argv
+
+
+def watch(args, search_dir):
+    """Poll search_dir and render each new ZIP+CSV pair as soon as it settles.
+
+    Renders run in this process through batch_render.main, so MoviePy, the
+    font cache and the overlay cache stay warm between batches.
+    """
+    import batch_render
+
+    inventory = Inventory(args.inventory or os.path.join(args.output, INVENTORY_NAME))
+    print(f"Watching {search_dir} (every {args.interval:g}s, Ctrl+C to stop)")
+    try:
+        while True:
+            inventory.scan(search_dir, args.settle)
+            zip_path = inventory.latest(".zip", video_only=True) or inventory.latest(".zip")
+            csv_path = inventory.latest(".csv")
+            if zip_path and csv_path and inventory.pair_key(zip_path, csv_path) != inventory.last_pair:
+                font_path = inventory.latest(".ttf")
+                print(f"New inputs: {zip_path} + {csv_path} (font: {font_path or 'None'})", flush=True)
+                try:
+                    batch_render.main(render_argv(args, zip_path, csv_path, font_path))
+                except SystemExit as e:
+                    print(f"Render stopped: {e}", flush=True)
+                except Exception as e:
+                    print(f"Render failed: {e}", flush=True)
+                # Recorded even on failure so a broken pair is retried only once its files change.
+                inventory.last_pair = inventory.pair_key(zip_path, csv_path)
+                inventory.save()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find newest ZIP/CSV/TTF in a folder and run batch_render.py.")
+    parser.add_argument("--dir", default="~/Downloads", help="Directory to search (default: ~/Downloads)")
+    parser.add_argument("--output", default="output", help="Output directory")
+    parser.add_argument("--motion", default="Static", help="Motion profile (default: Static)")
+    parser.add_argument("--text-color", default="#FFFFFF", help="Text color hex (default: #FFFFFF)")
+    parser.add_argument("--stroke-color", default="#000000", help="Stroke color hex (default: #000000)")
+    parser.add_argument("--title-size", type=int, default=150, help="Title size (default: 150)")
+    parser.add_argument("--body-size", type=int, default=120, help="Body size (default: 120)")
+    parser.add_argument("--stroke-width", type=int, default=4, help="Stroke width (default: 4)")
+    parser.add_argument("--shadow", type=int, default=4, help="Shadow offset (default: 4)")
+    parser.add_argument("--offset-x", type=int, default=0, help="Horizontal offset (default: 0)")
+    parser.add_argument("--offset-y", type=int, default=0, help="Vertical offset (default: 0)")
+    parser.add_argument("--template", default=None, help="JSON or YAML layer template (default: built-in layout)")
+    parser.add_argument("--backend", default="moviepy", help="Render backend: moviepy or ffmpeg (default: moviepy)")
+    parser.add_argument("--jobs", type=int, default=1, help="Parallel render processes, 0 = one per CPU (default: 1)")
+    parser.add_argument("--group-size", type=int, default=0, help="Rows encoded per shared decode (default: 0 = off)")
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=0,
+        help="GB of memory parallel renders may use (default: 0 = 80%% of this machine's memory)",
+    )
+    parser.add_argument("--draft", action="store_true", help="Fast proof render at reduced resolution and frame rate")
+    parser.add_argument("--watch", action="store_true", help="Keep running and render each new ZIP+CSV pair")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between folder scans in --watch (default: 5)")
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=5.0,
+        help="Ignore files modified within this many seconds, e.g. unfinished downloads (default: 5)",
+    )
+    parser.add_argument(
+        "--inventory",
+        default=None,
+        help=f"Inventory file for --watch (default: <output>/{INVENTORY_NAME})",
+    )
+    args = parser.parse_args()
+
+    search_dir = os.path.expanduser(args.dir)
+    if not os.path.isdir(search_dir):
+        raise SystemExit(f"Directory not found: {search_dir}")
+    if args.watch:
+        watch(args, search_dir)
+        return
+
+    zip_path = find_latest_video_zip(search_dir) or find_latest(search_dir, ["*.zip", "*.ZIP"])
+    csv_path = find_latest(search_dir, ["*.csv", "*.CSV"])
+    font_path = find_latest(search_dir, ["*.ttf", "*.TTF"])
+
+    if not zip_path or not csv_path:
+        raise SystemExit("Could not find a ZIP and CSV in the search directory.")
+
+    cmd = [sys.executable, "batch_render.py"] + render_argv(args, zip_path, csv_path, font_path)
 
     print(f"Using ZIP: {zip_path}")
     print(f"Using CSV: {csv_path}")
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import shutil
+import struct
+import time
+import zipfile
+
+from atomic_file import atomic_write
+from media_index import VideoIndex
+
+# Local file header: signature, version, flags, method, time, date, crc,
+# compressed size, size, name length, extra length.
+_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+
+# End of central directory: signature, disk, cd disk, entries here, entries,
+# cd size, cd offset, comment length.
+_END_RECORD = struct.Struct("<4sHHHHIIH")
+_END_SEARCH = 1 << 16
+
+# A live extraction touches its .part with every 1 MB chunk; one untouched
+# this long was left by a process that died mid-write.
+STALE_PART_SECONDS = 60
+
+
+def zip_digest(zip_file):
+    """Content hash of a zip (path or file object) that reads only its central directory.
+
+    The central directory lists every member's name, size and CRC-32, so a
+    change to any member's bytes changes the digest, without reading the
+    members themselves.
+    """
+    f = open(zip_file, "rb") if isinstance(zip_file, str) else zip_file
+    try:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - _END_SEARCH - _END_RECORD.size))
+        tail = f.read()
+        h = hashlib.sha256(str(size).encode())
+        pos = tail.rfind(b"PK\x05\x06")
+        if pos < 0 or pos + _END_RECORD.size > len(tail):
+            h.update(tail)
+            return h.hexdigest()
+        *_fields, cd_size, cd_offset, _comment = _END_RECORD.unpack_from(tail, pos)
+        if cd_offset == 0xFFFFFFFF or cd_size == 0xFFFFFFFF:
+            # Zip64 stores the real values elsewhere; the tail covers the records.
+            h.update(tail)
+            return h.hexdigest()
+        f.seek(cd_offset)
+        h.update(f.read(cd_size))
+        h.update(tail[pos:])
+        return h.hexdigest()
+    finally:
+        if isinstance(zip_file, str):
+            f.close()
+        else:
+            f.seek(0)
+
+
+class ZipSource:
+    """Videos inside an uploaded zip, materialized only when a render asks for one.
+
+    Members are looked up through a VideoIndex: by relative path, then by
+    basename, then case-insensitively. A stored (uncompressed) member of a zip
+    on disk is handed to ffmpeg in place as a `subfile:` byte range, so nothing
+    is copied. Anything else is extracted once into dest_dir on first use;
+    concurrent workers coordinate through an exclusive `.part` file, so each
+    member is written once per batch. A `.part` abandoned by a killed worker
+    stops blocking the others after STALE_PART_SECONDS.
+    """
+
+    def __init__(self, zip_file, dest_dir):
+        # zip_file is a path, or a file-like object (e.g. a Streamlit upload),
+        # which is always extracted since ffmpeg cannot read it by offset.
+        self.zip_file = zip_file
+        self.dest_dir = dest_dir
+        with zipfile.ZipFile(zip_file, "r") as z:
+            infos = [info for info in z.infolist() if not info.is_dir()]
+        self._members = {info.filename: info for info in infos}
+        self.index = VideoIndex(self._members)
+
+    def names(self):
+        """Return every member name (directories excluded)."""
+        return list(self._members)
+
+    def find(self, filename):
+        """Return the member name for filename, or None."""
+        return self.index.lookup(filename)
+
+    def fingerprint(self, filename):
+        """Identify a member's bytes from the central directory (name, size, CRC-32) without reading it."""
+        name = self.find(filename)
+        if name is None:
+            return None
+        info = self._members[name]
+        return {"member": name, "size": info.file_size, "crc": info.CRC}
+
+    def path_for(self, filename):
+        """Return a path ffmpeg can open for filename, extracting it if needed."""
+        name = self.find(filename)
+        if name is None:
+            return os.path.join(self.dest_dir, filename)
+        return self.peek_path(filename) or self._extract(self._members[name])
+
+    def peek_path(self, filename):
+        """Return a path ffmpeg can open for filename without extracting anything, or None.
+
+        That is the `subfile:` range of a stored member, or a member some
+        earlier render already extracted.
+        """
+        name = self.find(filename)
+        if name is None:
+            return None
+        info = self._members[name]
+        if isinstance(self.zip_file, str) and info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            start = self._data_offset(info)
+            return f"subfile,,start,{start},end,{start + info.file_size},,:{os.path.abspath(self.zip_file)}"
+        dest = os.path.join(self.dest_dir, *self._parts(info))
+        return dest if os.path.exists(dest) else None
+
+    def _data_offset(self, info):
+        with open(self.zip_file, "rb") as f:
+            f.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        # The local header's name/extra lengths can differ from the central directory's.
+        return info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1]
+
+    @staticmethod
+    def _parts(info):
+        # Drop empty, "." and ".." components like ZipFile.extract does.
+        return [p for p in info.filename.split("/") if p not in ("", ".", "..")]
+
+    def _extract(self, info):
+        dest = os.path.join(self.dest_dir, *self._parts(info))
+        part = dest + ".part"
+        while not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            try:
+                fd = os.open(part, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._part_age(part) < STALE_PART_SECONDS:
+                    # Another worker is writing this member; wait for its rename.
+                    time.sleep(0.05)
+                    continue
+                # Its writer died. Extract through a temporary file of our own rather
+                # than reclaiming the .part, which other waiters may be eyeing too.
+                with atomic_write(dest, "wb") as out:
+                    self._copy(info, out)
+                if os.path.exists(part):
+                    os.remove(part)
+                break
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    self._copy(info, out)
+                os.replace(part, dest)
+            except BaseException:
+                if os.path.exists(part):
+                    os.remove(part)
+                raise
+        return dest
+
+    def _copy(self, info, out):
+        with zipfile.ZipFile(self.zip_file, "r") as z, z.open(info) as src:
+            shutil.copyfileobj(src, out, 1 << 20)
+
+    @staticmethod
+    def _part_age(part):
+        try:
+            return time.time() - os.stat(part).st_mtime
+        except FileNotFoundError:
+            # Just renamed into place or removed; the loop rechecks.
+            return 0.0